@@ -0,0 +1,47 @@
+"""Deduplicate user_progress and add unique constraints
+
+Revision ID: 4f2a9c1d7e63
+Revises: 20251217145000
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4f2a9c1d7e63'
+down_revision = '20251217145000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep one row per (user, test) and (user, attachment): prefer a completed
+    # row, then the earliest completion.
+    for column in ("test_id", "attachment_id"):
+        op.execute(f"""
+            DELETE FROM user_progress
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY user_id, {column}
+                        ORDER BY is_completed DESC NULLS LAST, completed_at ASC, id
+                    ) AS rn
+                    FROM user_progress
+                    WHERE {column} IS NOT NULL
+                ) duplicates
+                WHERE duplicates.rn > 1
+            )
+        """)
+
+    op.create_unique_constraint(
+        'uq_user_progress_user_test', 'user_progress', ['user_id', 'test_id']
+    )
+    op.create_unique_constraint(
+        'uq_user_progress_user_attachment', 'user_progress', ['user_id', 'attachment_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_user_progress_user_attachment', 'user_progress', type_='unique')
+    op.drop_constraint('uq_user_progress_user_test', 'user_progress', type_='unique')
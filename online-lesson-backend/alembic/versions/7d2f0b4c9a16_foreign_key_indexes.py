@@ -0,0 +1,43 @@
+"""Index foreign keys of child tables
+
+Revision ID: 7d2f0b4c9a16
+Revises: e1a7c3b95d48
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2f0b4c9a16'
+down_revision = 'e1a7c3b95d48'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_materials_section_id', 'materials', ['section_id', 'id']),
+    ('ix_tests_material_id', 'tests', ['material_id', 'id']),
+    ('ix_attachments_material_id', 'attachments', ['material_id', 'created_at']),
+    ('ix_user_progress_test_id', 'user_progress', ['test_id']),
+    ('ix_user_progress_attachment_id', 'user_progress', ['attachment_id']),
+    ('ix_section_progress_section_id', 'section_progress', ['section_id']),
+    ('ix_watch_progress_attachment_id', 'watch_progress', ['attachment_id']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY so user_progress keeps taking writes while it is indexed
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table, postgresql_concurrently=True, if_exists=True
+            )
@@ -0,0 +1,55 @@
+"""Add section progress rollup
+
+Revision ID: 9b3e5d0a2c71
+Revises: 4f2a9c1d7e63
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3e5d0a2c71'
+down_revision = '4f2a9c1d7e63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('sections', sa.Column('total_items', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table('section_progress',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('section_id', sa.Integer(), nullable=False),
+    sa.Column('completed_items', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['section_id'], ['sections.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'section_id')
+    )
+
+    # Backfill from the existing progress data
+    op.execute("""
+        UPDATE sections SET total_items =
+            (SELECT count(*) FROM attachments a JOIN materials m ON m.id = a.material_id
+             WHERE m.section_id = sections.id)
+          + (SELECT count(*) FROM tests t JOIN materials m ON m.id = t.material_id
+             WHERE m.section_id = sections.id)
+    """)
+    op.execute("""
+        INSERT INTO section_progress (user_id, section_id, completed_items)
+        SELECT up.user_id, COALESCE(tm.section_id, am.section_id), count(*)
+        FROM user_progress up
+        LEFT JOIN tests t ON t.id = up.test_id
+        LEFT JOIN materials tm ON tm.id = t.material_id
+        LEFT JOIN attachments a ON a.id = up.attachment_id
+        LEFT JOIN materials am ON am.id = a.material_id
+        WHERE up.is_completed = 1
+          AND COALESCE(tm.section_id, am.section_id) IS NOT NULL
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('section_progress')
+    op.drop_column('sections', 'total_items')
@@ -0,0 +1,36 @@
+"""Add watch_progress
+
+Revision ID: c5d81f4e9a02
+Revises: 9b3e5d0a2c71
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d81f4e9a02'
+down_revision = '9b3e5d0a2c71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('watch_progress',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('attachment_id', sa.UUID(), nullable=False),
+    sa.Column('position', sa.Float(), nullable=False),
+    sa.Column('duration', sa.Float(), nullable=False),
+    sa.Column('watched_ranges', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('watched_seconds', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['attachment_id'], ['attachments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'attachment_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('watch_progress')
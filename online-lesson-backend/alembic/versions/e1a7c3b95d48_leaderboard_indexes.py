@@ -0,0 +1,30 @@
+"""Add leaderboard indexes
+
+Revision ID: e1a7c3b95d48
+Revises: c5d81f4e9a02
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a7c3b95d48'
+down_revision = 'c5d81f4e9a02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_test_sessions_score_created', 'test_sessions', [sa.text('score_percentage DESC'), 'created_at'], unique=False)
+    op.create_index('ix_test_sessions_user_score', 'test_sessions', ['user_id', sa.text('score_percentage DESC'), 'created_at'], unique=False)
+    op.create_index(op.f('ix_users_faculty'), 'users', ['faculty'], unique=False)
+    op.create_index(op.f('ix_users_direction'), 'users', ['direction'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_direction'), table_name='users')
+    op.drop_index(op.f('ix_users_faculty'), table_name='users')
+    op.drop_index('ix_test_sessions_user_score', table_name='test_sessions')
+    op.drop_index('ix_test_sessions_score_created', table_name='test_sessions')
@@ -0,0 +1,258 @@
+"""
+Admission control for burst-prone routes (login, exam start/submit).
+
+For every limited route the middleware first applies token-bucket rate
+limits per client IP and per user (user id from the bearer token claims,
+no database access), answering 429 when a bucket is empty. It then admits
+at most ``max_concurrency`` requests at a time; up to ADMISSION_QUEUE_SIZE
+more wait at most ADMISSION_QUEUE_TIMEOUT_SECONDS for a slot and anything
+beyond that is refused right away with 503. Both refusals carry
+Retry-After, so clients back off instead of piling onto the database pool.
+
+Concurrency limits are per process since they protect the process's own
+connection pool. Rate limit buckets live in process memory by default; set
+ADMISSION_REDIS_URL to share them between workers (requires ``redis``).
+If the shared backend fails, the in-memory buckets are used instead.
+"""
+import asyncio
+import logging
+import math
+import time
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from . import oauth2
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RouteLimit:
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        max_concurrency: int,
+        ip_rate: float,
+        ip_burst: int,
+        user_rate: float = None,
+        user_burst: int = None,
+    ):
+        self.method = method
+        self.path = path
+        self.ip_rate = ip_rate
+        self.ip_burst = ip_burst
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.limiter = ConcurrencyLimiter(
+            max_concurrency,
+            settings.ADMISSION_QUEUE_SIZE,
+            settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        )
+
+
+class ConcurrencyLimiter:
+    """Semaphore with a bounded number of waiters and a bounded wait."""
+
+    def __init__(self, limit: int, max_queue: int, timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> bool:
+        if not self._semaphore.locked():
+            # Free slot: Semaphore.acquire returns without suspending
+            return await self._semaphore.acquire()
+        if self.waiting >= self.max_queue:
+            return False
+        self.waiting += 1
+        # Not wait_for: on 3.11 a timeout or cancellation landing as the
+        # acquire succeeds can drop its result, and with it a permit
+        acquire = asyncio.create_task(self._semaphore.acquire())
+        admitted = False
+        try:
+            await asyncio.wait((acquire,), timeout=self.timeout)
+            admitted = acquire.done()
+            return admitted
+        finally:
+            self.waiting -= 1
+            if not admitted:
+                acquire.cancel()
+                acquire.add_done_callback(self._release_late)
+
+    def _release_late(self, acquire: asyncio.Task):
+        # Timed out or cancelled, but the acquire got its permit anyway
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._semaphore.release()
+
+    def release(self):
+        self._semaphore.release()
+
+
+class InMemoryBuckets:
+    """Token buckets in process memory; only touched from the event loop."""
+
+    MAX_KEYS = 100_000
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated_at)
+
+    async def consume(self, key: str, rate: float, burst: int):
+        """Take a token; returns seconds to wait if the bucket is empty."""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+            return 0
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / rate
+
+    def _prune(self, now: float):
+        # Buckets idle for a minute are full again and can be forgotten
+        self._buckets = {
+            key: value for key, value in self._buckets.items() if now - value[1] < 60
+        }
+
+
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Token buckets shared by all workers through Redis."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # optional dependency
+
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_TOKEN_BUCKET)
+        self._fallback = InMemoryBuckets()
+
+    async def consume(self, key: str, rate: float, burst: int):
+        try:
+            wait = await self._script(
+                keys=[f"admission:{key}"], args=[rate, burst, time.time()]
+            )
+            return float(wait)
+        except Exception:
+            logger.warning("Shared rate limit backend unavailable", exc_info=True)
+            return await self._fallback.consume(key, rate, burst)
+
+
+def _too_many(status_code: int, detail: str, retry_after: float):
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def _bearer_user_id(scope):
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                return oauth2.verify_access_token(token, HTTPException(401)).id
+            except HTTPException:
+                return None  # the route itself answers 401
+    return None
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app, limits, buckets=None):
+        self.app = app
+        self.limits = {(limit.method, limit.path): limit for limit in limits}
+        self.buckets = buckets or InMemoryBuckets()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limit = self.limits.get((scope["method"], scope["path"].rstrip("/") or "/"))
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        client_ip = scope["client"][0] if scope.get("client") else "unknown"
+        wait = await self.buckets.consume(
+            f"ip:{limit.path}:{client_ip}", limit.ip_rate, limit.ip_burst
+        )
+        if not wait and limit.user_rate:
+            user_id = _bearer_user_id(scope)
+            if user_id is not None:
+                wait = await self.buckets.consume(
+                    f"user:{limit.path}:{user_id}", limit.user_rate, limit.user_burst
+                )
+        if wait:
+            return await _too_many(
+                429, "Juda ko‘p so‘rov, birozdan so‘ng qayta urinib ko‘ring", wait
+            )(scope, receive, send)
+
+        if not await limit.limiter.acquire():
+            return await _too_many(
+                503,
+                "Server band, birozdan so‘ng qayta urinib ko‘ring",
+                limit.limiter.timeout,
+            )(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.limiter.release()
+
+
+def default_limits():
+    return [
+        RouteLimit(
+            "POST",
+            "/auth/login",
+            max_concurrency=settings.ADMISSION_LOGIN_CONCURRENCY,
+            ip_rate=settings.ADMISSION_IP_RATE_PER_SECOND,
+            ip_burst=settings.ADMISSION_IP_BURST,
+        ),
+        RouteLimit(
+            "POST",
+            "/test-sessions/start",
+            max_concurrency=settings.ADMISSION_EXAM_CONCURRENCY,
+            ip_rate=settings.ADMISSION_IP_RATE_PER_SECOND,
+            ip_burst=settings.ADMISSION_IP_BURST,
+            user_rate=settings.ADMISSION_USER_RATE_PER_SECOND,
+            user_burst=settings.ADMISSION_USER_BURST,
+        ),
+        RouteLimit(
+            "POST",
+            "/test-sessions/submit",
+            max_concurrency=settings.ADMISSION_EXAM_CONCURRENCY,
+            ip_rate=settings.ADMISSION_IP_RATE_PER_SECOND,
+            ip_burst=settings.ADMISSION_IP_BURST,
+            user_rate=settings.ADMISSION_USER_RATE_PER_SECOND,
+            user_burst=settings.ADMISSION_USER_BURST,
+        ),
+    ]
+
+
+def default_buckets():
+    if settings.ADMISSION_REDIS_URL:
+        return RedisBuckets(settings.ADMISSION_REDIS_URL)
+    return InMemoryBuckets()
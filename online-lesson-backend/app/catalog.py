@@ -0,0 +1,28 @@
+"""
+Short-lived cache of the catalog listings (sections, materials by section).
+
+Entries are dropped in every worker when a section, material, attachment
+or test change is committed. They also expire after
+CATALOG_CACHE_TTL_SECONDS, which bounds staleness when a listing was
+filled from a lagging read replica.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import invalidation, models
+from .cache import TTLCache
+from .config import settings
+
+cache = TTLCache(1000, settings.CATALOG_CACHE_TTL_SECONDS)
+
+_CATALOG_MODELS = (models.Section, models.Material, models.Attachment, models.Test)
+
+invalidation.bus.subscribe("catalog", lambda key: cache.clear())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_catalog_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _CATALOG_MODELS):
+            invalidation.publish_on_commit(session, "catalog")
+            return
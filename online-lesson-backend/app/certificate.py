@@ -0,0 +1,113 @@
+"""
+PDF certificate for a passed final exam.
+"""
+
+
+def render_certificate(
+    output,
+    full_name: str,
+    correct_answers: int,
+    total_questions: int,
+    score_percentage: int,
+    created_at,
+):
+    """Draw the certificate to ``output``, a file name or a binary file object."""
+    # ReportLab is only needed here; importing it lazily keeps worker startup fast
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(output, pagesize=A4)
+    width, height = A4
+
+    # Set colors and fonts
+    c.setFillColor(colors.HexColor("#012c6e"))  # Dark blue
+
+    # Draw border
+    c.setStrokeColor(colors.HexColor("#faad14"))  # Gold
+    c.setLineWidth(3)
+    c.rect(30, 30, width - 60, height - 60, stroke=1, fill=0)
+
+    # Draw inner border
+    c.setStrokeColor(colors.HexColor("#012c6e"))
+    c.setLineWidth(1)
+    c.rect(40, 40, width - 80, height - 80, stroke=1, fill=0)
+
+    # Title
+    c.setFont("Helvetica-Bold", 36)
+    c.setFillColor(colors.HexColor("#012c6e"))
+    c.drawCentredString(width / 2, height - 120, "SERTIFIKAT")
+
+    # Subtitle
+    c.setFont("Helvetica", 16)
+    c.setFillColor(colors.HexColor("#666666"))
+    c.drawCentredString(width / 2, height - 150, "Yakuniy Test Natijalari")
+
+    # Horizontal line
+    c.setStrokeColor(colors.HexColor("#faad14"))
+    c.setLineWidth(2)
+    c.line(100, height - 170, width - 100, height - 170)
+
+    # Certificate text
+    c.setFont("Helvetica", 14)
+    c.setFillColor(colors.black)
+
+    # "This certifies that"
+    c.drawCentredString(
+        width / 2, height - 220, "Ushbu sertifikat quyidagi shaxsga beriladi:"
+    )
+
+    # User name
+    c.setFont("Helvetica-Bold", 24)
+    c.setFillColor(colors.HexColor("#012c6e"))
+    c.drawCentredString(width / 2, height - 270, full_name)
+
+    # Achievement text
+    c.setFont("Helvetica", 14)
+    c.setFillColor(colors.black)
+    c.drawCentredString(
+        width / 2, height - 320, "Yakuniy testni muvaffaqiyatli yakunladi"
+    )
+
+    # Test results box
+    c.setFillColor(colors.HexColor("#f0f0f0"))
+    c.rect(150, height - 450, width - 300, 100, stroke=0, fill=1)
+
+    # Results
+    c.setFont("Helvetica-Bold", 16)
+    c.setFillColor(colors.HexColor("#012c6e"))
+    c.drawCentredString(width / 2, height - 380, "Natijalar:")
+
+    c.setFont("Helvetica", 14)
+    c.setFillColor(colors.black)
+    result_text = f"To'g'ri javoblar: {correct_answers} / {total_questions}"
+    c.drawCentredString(width / 2, height - 410, result_text)
+
+    score_text = f"Natija: {score_percentage}%"
+    c.setFont("Helvetica-Bold", 16)
+    score_color = (
+        "#52c41a"
+        if score_percentage >= 70
+        else "#faad14" if score_percentage >= 50 else "#ff4d4f"
+    )
+    c.setFillColor(colors.HexColor(score_color))
+    c.drawCentredString(width / 2, height - 435, score_text)
+
+    # Date
+    c.setFont("Helvetica", 12)
+    c.setFillColor(colors.black)
+    date_str = created_at.strftime("%d.%m.%Y")
+    c.drawCentredString(width / 2, height - 500, f"Sana: {date_str}")
+
+    # Footer
+    c.setFont("Helvetica-Oblique", 10)
+    c.setFillColor(colors.HexColor("#666666"))
+    c.drawCentredString(width / 2, 80, "Online Ta'lim Platformasi")
+    c.drawCentredString(width / 2, 60, "www.online-lesson.uz")
+
+    # Logo placeholder (you can add actual logo if available)
+    c.setFont("Helvetica-Bold", 20)
+    c.setFillColor(colors.HexColor("#faad14"))
+    c.drawCentredString(width / 2, height - 80, "OXU")
+
+    c.save()
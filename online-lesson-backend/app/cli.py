@@ -0,0 +1,111 @@
+"""
+Administrative commands, run once per deploy rather than on every worker boot.
+
+    python -m app.cli init-db   # create or migrate the schema (Alembic)
+    python -m app.cli seed      # default admin and sections, idempotent
+    python -m app.cli datagen   # synthetic production-scale data (app/datagen.py)
+"""
+import argparse
+import os
+
+from sqlalchemy import inspect
+
+from . import datagen, models, utils
+from .database import SessionLocal, engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SECTIONS = ["Maruza", "Amaliy", "Tajriba", "Mustaqil Ish", "Yakuniy Test"]
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    return config
+
+
+def init_db():
+    """Create the schema on an empty database, otherwise migrate it to head.
+
+    The migration chain starts from an existing schema, so an empty database
+    gets the current models and is stamped at head instead.
+    """
+    from alembic import command
+
+    config = _alembic_config()
+    if not inspect(engine).has_table(models.User.__tablename__):
+        models.Base.metadata.create_all(bind=engine)
+        command.stamp(config, "head")
+        print("Created schema and stamped it at head")
+    else:
+        command.upgrade(config, "head")
+
+
+def seed(admin_username: str, admin_password: str):
+    """Add the admin user and default sections if they are missing."""
+    db = SessionLocal()
+    try:
+        admin = db.query(models.User).filter(models.User.role == "admin").first()
+        if not admin:
+            db.add(
+                models.User(
+                    username=admin_username,
+                    firstname="admin",
+                    lastname="admin",
+                    faculty="",
+                    direction="",
+                    role="admin",
+                    password=utils.hash_password(admin_password),
+                )
+            )
+            print(f"Added admin user {admin_username!r}")
+
+        existing = {name for (name,) in db.query(models.Section.name)}
+        # "Yakuniy Test" is always needed; the rest only on an empty catalog
+        missing = [
+            name
+            for name in (DEFAULT_SECTIONS if not existing else ["Yakuniy Test"])
+            if name not in existing
+        ]
+        for name in missing:
+            db.add(models.Section(name=name))
+        if missing:
+            print(f"Added sections: {', '.join(missing)}")
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("init-db", help="create or migrate the database schema")
+    seed_parser = commands.add_parser("seed", help="add default admin and sections")
+    seed_parser.add_argument("--admin-username", default="admin")
+    seed_parser.add_argument(
+        "--admin-password", default=os.environ.get("ADMIN_PASSWORD", "admin123")
+    )
+    datagen_parser = commands.add_parser(
+        "datagen", help="append synthetic users, course content, progress and exams"
+    )
+    datagen_parser.add_argument("--seed", type=int, default=1)
+    for field, default in datagen.Profile._field_defaults.items():
+        datagen_parser.add_argument(
+            f"--{field.replace('_', '-')}", type=type(default), default=default
+        )
+    args = parser.parse_args()
+
+    if args.command == "init-db":
+        init_db()
+    elif args.command == "seed":
+        seed(args.admin_username, args.admin_password)
+    elif args.command == "datagen":
+        seed("admin", os.environ.get("ADMIN_PASSWORD", "admin123"))
+        profile = datagen.Profile(**{f: getattr(args, f) for f in datagen.Profile._fields})
+        datagen.generate(engine, profile, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
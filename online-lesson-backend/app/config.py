@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -7,6 +9,81 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     ALGORITHM: str
 
+    # Connection pool (app/database.py). Sync handlers run on THREADPOOL_SIZE
+    # threads, so POOL_SIZE + MAX_OVERFLOW >= THREADPOOL_SIZE avoids waits.
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800  # seconds; -1 disables
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # 0 disables
+    THREADPOOL_SIZE: int = 40
+    # asyncpg URL for the async engine; None = DATABASE_URL with asyncpg driver
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Read replica for GET requests (app/database.py); None = primary only
+    READ_DATABASE_URL: Optional[str] = None
+    ASYNC_READ_DATABASE_URL: Optional[str] = None  # None = derived as above
+    READ_AFTER_WRITE_SECONDS: float = 5.0  # primary-only window after a write
+
+    # Bearer token scrapers must send to GET /metrics; None = not served
+    METRICS_TOKEN: Optional[str] = None
+
+    # Request instrumentation (app/instrumentation.py)
+    SERVER_TIMING_ENABLED: bool = True
+    QUERY_ALARM_THRESHOLD: int = 20  # log requests running more queries; 0 = off
+
+    # Admin on-demand request profiling (app/profiling.py)
+    PROFILING_ENABLED: bool = True
+    PROFILE_SAMPLE_INTERVAL_MS: float = 1.0
+    PROFILE_BUFFER_SIZE: int = 50
+
+    # Slow-query log (app/slow_queries.py)
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0  # 0 = off
+    SLOW_QUERY_MAX_FINGERPRINTS: int = 500
+    SLOW_QUERY_SAMPLES: int = 5  # recent occurrences kept per fingerprint
+
+    # Password hashing (app/utils.py)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 256
+    PASSWORD_HASH_PROCESSES: Optional[int] = None  # bulk imports; None = all cores
+    IMPORT_BCRYPT_ROUNDS: Optional[int] = None  # bulk imports; None = BCRYPT_ROUNDS
+
+    # Decoded token / current user caches (app/oauth2.py)
+    AUTH_CACHE_TTL_SECONDS: float = 30.0
+    AUTH_CACHE_SIZE: int = 10000
+
+    # Video watch progress ingestion (app/watch_events.py)
+    WATCH_FLUSH_INTERVAL_SECONDS: float = 5.0
+    WATCH_COMPLETION_RATIO: float = 0.9
+    WATCH_MAX_PENDING: int = 50000
+    WATCH_FLUSH_MAX_ATTEMPTS: int = 12
+
+    # Cross-worker cache invalidation over LISTEN/NOTIFY (app/invalidation.py)
+    INVALIDATION_BUS_ENABLED: bool = True
+    CATALOG_CACHE_TTL_SECONDS: float = 30.0
+
+    # Entries kept per cohort by the in-memory leaderboard (app/leaderboard.py)
+    LEADERBOARD_TOP_K: int = 100
+
+    # Live exam counters streamed to admins (app/monitoring.py)
+    EXAM_MONITOR_PUSH_INTERVAL_SECONDS: float = 1.0
+    EXAM_MONITOR_HEARTBEAT_SECONDS: float = 15.0
+    EXAM_MONITOR_STALE_AFTER_MINUTES: float = 180.0
+
+    # Admission control for login / exam bursts (app/admission.py)
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_LOGIN_CONCURRENCY: int = 8
+    ADMISSION_EXAM_CONCURRENCY: int = 16
+    ADMISSION_QUEUE_SIZE: int = 200
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    ADMISSION_IP_RATE_PER_SECOND: float = 20.0
+    ADMISSION_IP_BURST: int = 100
+    ADMISSION_USER_RATE_PER_SECOND: float = 1.0
+    ADMISSION_USER_BURST: int = 5
+    ADMISSION_REDIS_URL: Optional[str] = None
+
     class Config:
         env_file = ".env"
 
@@ -1,6 +1,15 @@
+import hashlib
+import time
+
+from fastapi import Request
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import QueuePool
+from . import invalidation, metrics
+from .cache import TTLCache
 from .config import settings
 
 # import psycopg2
@@ -8,15 +17,209 @@ from .config import settings
 # import time
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+pool_checkout_seconds = metrics.Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled connection"
+)
+pool_checkout_waits = metrics.Counter(
+    "db_pool_checkout_waits_total",
+    "Checkouts that found no idle connection and no overflow left",
+)
+pool_checkout_timeouts = metrics.Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT"
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool recording checkout latency, waits and timeouts."""
+
+    def _do_get(self):
+        # Same condition QueuePool uses to block on its queue
+        if (
+            self._max_overflow > -1
+            and self.checkedin() == 0
+            and self.overflow() >= self._max_overflow
+        ):
+            pool_checkout_waits.inc()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_checkout_timeouts.inc()
+            raise
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - started)
+
+
+def _connect_args():
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        # Applies to every statement of every session on the connection
+        return {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return {}
+
+
+def _create_engine(url):
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=_connect_args(),
+    )
+
+
+engine = _create_engine(SQLALCHEMY_DATABASE_URL)
 # engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"sslmode": "require"})
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
+# Optional streaming replica for read-only requests; None when not configured
+read_engine = (
+    _create_engine(settings.READ_DATABASE_URL) if settings.READ_DATABASE_URL else None
+)
+ReadSessionLocal = (
+    sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+    if read_engine is not None
+    else SessionLocal
+)
+
+metrics.Gauge("db_pool_size", "Configured pool size", lambda: engine.pool.size())
+metrics.Gauge(
+    "db_pool_checked_out", "Connections in use", lambda: engine.pool.checkedout()
+)
+metrics.Gauge(
+    "db_pool_idle", "Idle connections in the pool", lambda: engine.pool.checkedin()
+)
+metrics.Gauge(
+    "db_pool_overflow",
+    "Connections open beyond the pool size",
+    lambda: max(engine.pool.overflow(), 0),
+)
+
+
+# Read-your-writes: a client that committed something is served from the
+# primary for READ_AFTER_WRITE_SECONDS, so replica lag never hides its own
+# writes. Clients are keyed by a hash of their bearer token (anonymous
+# requests cannot be pinned). Pins are shared with the other workers over
+# the invalidation bus.
+_pinned = TTLCache(100_000, settings.READ_AFTER_WRITE_SECONDS)
+
+
+def _client_key(request: Request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def pin_to_primary(client_key):
+    if client_key is not None and read_engine is not None:
+        invalidation.bus.publish("read_pin", client_key)
+
+
+def _pin(client_key):
+    if client_key is not None:
+        _pinned.set(client_key, True)
+
+
+invalidation.bus.subscribe("read_pin", _pin)
+
+
+def _use_replica(request: Request) -> bool:
+    return request.method in ("GET", "HEAD") and not _pinned.get(_client_key(request))
 
-def get_db():
+
+@event.listens_for(SessionLocal, "after_commit")
+def _mark_written(session):
+    session.info["committed"] = True
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    try:
+        yield db
+    finally:
+        if db.info.get("committed"):
+            pin_to_primary(_client_key(request))
+        db.close()
+
+
+def get_read_db(request: Request):
+    """Session on the replica for GET requests, the primary otherwise."""
+    if read_engine is None or not _use_replica(request):
+        yield from get_db(request)
+        return
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# Async engine (asyncpg) for I/O-bound read endpoints that run on the event
+# loop instead of the threadpool. Same database and pool settings.
+def _async_url(url):
+    return make_url(url).set(drivername="postgresql+asyncpg")
+
+
+def _create_async_engine(url):
+    return create_async_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "server_settings": {
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)
+            }
+        },
+    )
+
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or _async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = _create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+async_read_engine = (
+    _create_async_engine(
+        settings.ASYNC_READ_DATABASE_URL or _async_url(settings.READ_DATABASE_URL)
+    )
+    if settings.READ_DATABASE_URL
+    else None
+)
+AsyncReadSessionLocal = (
+    async_sessionmaker(
+        async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+    if async_read_engine is not None
+    else AsyncSessionLocal
+)
+
+metrics.Gauge(
+    "db_async_pool_checked_out",
+    "Connections in use by the async engine",
+    lambda: async_engine.pool.checkedout(),
+)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    """Async session on the replica for GET requests, the primary otherwise."""
+    factory = (
+        AsyncReadSessionLocal
+        if async_read_engine is not None and _use_replica(request)
+        else AsyncSessionLocal
+    )
+    async with factory() as db:
+        yield db
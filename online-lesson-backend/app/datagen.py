@@ -0,0 +1,389 @@
+"""
+Synthetic data at production scale, for load tests and query-plan checks.
+
+    python -m app.cli datagen --users 100000 --seed 1
+
+Rows are appended to the existing tables with ``COPY ... FROM STDIN`` in
+chunks. New ids continue after the current maximum, and the sequences are
+moved past them afterwards. The same seed and profile on the same starting
+database produce the same rows, password salt aside (timestamps count back
+from midnight UTC, so on the same day).
+
+Distributions (see ``Profile``):
+- faculties are Zipf-weighted (``faculty_skew``), so a few large
+  faculties dominate cohort queries like they do in production;
+- each user's activity is drawn from Beta(``activity_alpha``,
+  ``activity_beta``). It scales how many course items they completed
+  (mean ``progress_per_user``) and how well they score on the exam;
+- ``sessions`` exam sessions are spread over random users, so some have
+  several. Their ``test_data`` has the same shape the submit endpoint
+  stores, graded by ``exam.grade_exam``.
+
+Every generated user has the password ``parol123``, hashed once. The
+foreign keys, unique constraints and secondary indexes of user_progress
+and test_sessions are dropped for the load and restored after it, in the
+same transaction, so the new rows are still fully checked. The section
+rollup is rebuilt and the tables ANALYZEd at the end.
+
+The rows are written with COPY, bypassing the invalidation bus. Running
+servers keep serving their cached catalog until CATALOG_CACHE_TTL_SECONDS
+expire, and their question bank, leaderboard and exam counters until they
+restart.
+"""
+import io
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import exam, models, progress_rollup, utils
+from .question_bank import Question
+
+Profile = namedtuple(
+    "Profile",
+    [
+        "users",
+        "faculties",
+        "directions_per_faculty",
+        "faculty_skew",
+        "materials",
+        "attachments_per_material",
+        "link_share",
+        "tests",
+        "progress_per_user",
+        "activity_alpha",
+        "activity_beta",
+        "sessions",
+        "days",
+    ],
+    defaults=[
+        100_000,  # users
+        8,  # faculties
+        6,  # directions_per_faculty
+        1.1,  # faculty_skew: Zipf exponent, 0 = uniform
+        2_000,  # materials
+        3.0,  # attachments_per_material (mean)
+        0.3,  # link_share: share of attachments that are links
+        50_000,  # tests
+        30.0,  # progress_per_user: mean completed items per user
+        1.2,  # activity_alpha
+        2.0,  # activity_beta
+        200_000,  # sessions
+        180,  # days of history for timestamps
+    ],
+)
+
+COPY_CHUNK_ROWS = 50_000
+NULL = "\\N"
+PASSWORD = "parol123"
+
+FIRSTNAMES = [
+    "Aziz", "Bekzod", "Dilnoza", "Gulnora", "Jasur", "Kamola", "Laylo", "Madina",
+    "Nodir", "Otabek", "Rustam", "Sardor", "Shahnoza", "Umid", "Zarina", "Zafar",
+]
+LASTNAMES = [
+    "Abdullayev", "Karimova", "Rahimov", "Tursunova", "Yusupov", "Qodirova",
+    "Ergashev", "Mirzayeva", "Saidov", "Xolmatova", "Islomov", "Nazarova",
+]
+
+
+def _escape(value: str) -> str:
+    """A text value for COPY's text format."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy(cursor, table: str, columns, lines) -> int:
+    """COPY tab-separated ``lines`` into ``table`` in chunks; returns the row count.
+
+    A writer thread sends each chunk while the next one is generated, so the
+    server's work overlaps with Python's.
+    """
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    chunks = queue.Queue(maxsize=2)
+    errors = []
+
+    def writer():
+        while (chunk := chunks.get()) is not None:
+            if not errors:
+                try:
+                    cursor.copy_expert(sql, io.StringIO(chunk))
+                except Exception as exc:
+                    errors.append(exc)
+
+    thread = threading.Thread(target=writer, name=f"copy-{table}", daemon=True)
+    thread.start()
+    lines = iter(lines)
+    total = 0
+    try:
+        while not errors:
+            chunk = list(islice(lines, COPY_CHUNK_ROWS))
+            if not chunk:
+                break
+            chunks.put("\n".join(chunk) + "\n")
+            total += len(chunk)
+    finally:
+        chunks.put(None)
+        thread.join()
+    if errors:
+        raise errors[0]
+    return total
+
+
+def _drop_constraints_and_indexes(cursor, table: str):
+    """Drop ``table``'s foreign keys, unique constraints and secondary indexes.
+
+    Returns the DDL that restores them, read from the catalog. Checking and
+    indexing a bulk load once afterwards (as pg_restore does) is much cheaper
+    than firing a foreign key trigger and updating every index per row.
+    """
+    cursor.execute(
+        """
+        SELECT pg_get_indexdef(x.indexrelid) FROM pg_index x
+        WHERE x.indrelid = %s::regclass AND NOT x.indisprimary
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+        """,
+        (table,),
+    )
+    indexes = [ddl for (ddl,) in cursor.fetchall()]
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype IN ('u', 'f')
+        ORDER BY contype DESC
+        """,
+        (table,),
+    )
+    constraints = cursor.fetchall()  # unique ones first, so foreign keys come last
+
+    for name, _ in reversed(constraints):
+        cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+    for ddl in indexes:
+        cursor.execute(f"DROP INDEX {ddl.split()[2]}")
+    return indexes + [
+        f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}'
+        for name, definition in constraints
+    ]
+
+
+class _Generator:
+    def __init__(self, profile: Profile, seed: int, now: datetime):
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.now = now
+
+    def uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def timestamp(self) -> str:
+        return (self.now - timedelta(days=self.rng.random() * self.profile.days)).isoformat()
+
+    def activity(self) -> float:
+        return self.rng.betavariate(self.profile.activity_alpha, self.profile.activity_beta)
+
+
+def _max_id(cursor, table: str) -> int:
+    cursor.execute(f"SELECT coalesce(max(id), 0) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def _reset_sequence(cursor, table: str):
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+        f"(SELECT max(id) FROM {table}))"
+    )
+
+
+def generate(engine, profile: Profile = Profile(), seed: int = 1, log=print) -> dict:
+    """Append a dataset shaped by ``profile``; returns rows loaded per table."""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    gen = _Generator(profile, seed, today)
+    rng = gen.rng
+    counts = {}
+    started = time.perf_counter()
+
+    def loaded(table, rows):
+        counts[table] = rows
+        log(f"{table:<15} {rows:>10} rows  {time.perf_counter() - started:6.1f} s")
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("SELECT id FROM sections ORDER BY id")
+        section_ids = [row[0] for row in cursor.fetchall()]
+        if not section_ids:
+            raise RuntimeError("No sections; run `python -m app.cli seed` first")
+
+        # --- users ---
+        password_hash = utils.hash_password(PASSWORD)
+        faculties = [f"Fakultet {i}" for i in range(1, profile.faculties + 1)]
+        faculty_weights = [1 / (i ** profile.faculty_skew) for i in range(1, len(faculties) + 1)]
+        first_user = _max_id(cursor, "users") + 1
+        user_ids = range(first_user, first_user + profile.users)
+        activity = {user_id: gen.activity() for user_id in user_ids}
+
+        def user_lines():
+            for user_id in user_ids:
+                faculty = rng.choices(range(len(faculties)), faculty_weights)[0]
+                direction = rng.randrange(profile.directions_per_faculty) + 1
+                yield (
+                    f"{user_id}\t{rng.choice(FIRSTNAMES)}\t{rng.choice(LASTNAMES)}\t"
+                    f"{faculties[faculty]}\tYo'nalish {faculty + 1}-{direction}\t"
+                    f"student{user_id}\t{password_hash}\tuser"
+                )
+
+        loaded("users", _copy(
+            cursor, "users",
+            ("id", "firstname", "lastname", "faculty", "direction", "username",
+             "password", "role"),
+            user_lines(),
+        ))
+
+        # --- materials and attachments ---
+        first_material = _max_id(cursor, "materials") + 1
+        material_ids = range(first_material, first_material + profile.materials)
+        loaded("materials", _copy(
+            cursor, "materials", ("id", "section_id", "title"),
+            (f"{m}\t{rng.choice(section_ids)}\tMavzu {m}" for m in material_ids),
+        ))
+
+        attachment_ids = []
+
+        def attachment_lines():
+            for material_id in material_ids:
+                count = round(rng.expovariate(1 / profile.attachments_per_material))
+                for n in range(max(1, count)):
+                    attachment_id = gen.uuid()
+                    attachment_ids.append(attachment_id)
+                    if rng.random() < profile.link_share:
+                        path, name, kind = f"https://youtu.be/{attachment_id.hex[:11]}", f"Video {n + 1}", "link"
+                    else:
+                        path, name, kind = f"uploads/{attachment_id}.pdf", f"Maruza {n + 1}.pdf", "file"
+                    yield f"{attachment_id}\t{path}\t{name}\t{kind}\t{gen.timestamp()}\t{material_id}"
+
+        loaded("attachments", _copy(
+            cursor, "attachments",
+            ("id", "path", "name", "type", "created_at", "material_id"),
+            attachment_lines(),
+        ))
+
+        # --- tests ---
+        first_test = _max_id(cursor, "tests") + 1
+        questions = []
+        for test_id in range(first_test, first_test + profile.tests):
+            options = tuple(f"Javob {k} ({test_id})" for k in "ABCD")
+            questions.append(Question(
+                id=test_id,
+                material_id=rng.choice(material_ids),
+                question=f"Savol {test_id}: quyidagilardan qaysi biri to'g'ri?",
+                options=options,
+                correct_answer=rng.choice(options),
+            ))
+        loaded("tests", _copy(
+            cursor, "tests",
+            ("id", "material_id", "question", "options", "correct_answer"),
+            (
+                f"{q.id}\t{q.material_id}\t{q.question}\t"
+                f"{_escape(json.dumps(list(q.options), ensure_ascii=False))}\t{q.correct_answer}"
+                for q in questions
+            ),
+        ))
+
+        restore = []
+        for model in (models.UserProgress, models.TestSession):
+            restore += _drop_constraints_and_indexes(cursor, model.__tablename__)
+
+        # --- user_progress: a distinct random subset of items per user ---
+        items = [(None, str(a)) for a in attachment_ids] + [(q.id, None) for q in questions]
+
+        def progress_lines():
+            for user_id in user_ids:
+                wanted = round(activity[user_id] * 2 * profile.progress_per_user)
+                for index in rng.sample(range(len(items)), min(wanted, len(items))):
+                    test_id, attachment_id = items[index]
+                    yield (
+                        f"{gen.uuid()}\t{user_id}\t{attachment_id or NULL}\t"
+                        f"{test_id or NULL}\t1\t{gen.timestamp()}"
+                    )
+
+        loaded("user_progress", _copy(
+            cursor, "user_progress",
+            ("id", "user_id", "attachment_id", "test_id", "is_completed", "completed_at"),
+            progress_lines(),
+        ))
+
+        # --- test_sessions, graded like /test-sessions/submit ---
+        exam_size = min(exam.EXAM_QUESTION_COUNT, len(questions))
+        fragments = {}  # (question id, answer) -> escaped JSON of its result
+
+        def result_json(question, answer):
+            key = (question.id, answer)
+            fragment = fragments.get(key)
+            if fragment is None:
+                [result], *_ = exam.grade_exam([question], {str(question.id): answer})
+                fragment = fragments[key] = _escape(json.dumps(result, ensure_ascii=False))
+            return fragment
+
+        def session_lines():
+            for _ in range(profile.sessions):
+                user_id = rng.choice(user_ids)
+                accuracy = 0.3 + 0.65 * activity[user_id]
+                picked = rng.sample(questions, exam_size)
+                answers = {
+                    str(q.id): q.correct_answer if rng.random() < accuracy else rng.choice(q.options)
+                    for q in picked
+                }
+                _, correct, score, passed = exam.grade_exam(picked, answers)
+                created_at = gen.timestamp()
+                # Same document as json.dumps({"results": ..., "submitted_at": ...})
+                test_data = (
+                    '{"results": ['
+                    + ", ".join(result_json(q, answers[str(q.id)]) for q in picked)
+                    + f'], "submitted_at": "{created_at}"}}'
+                )
+                yield (
+                    f"{gen.uuid()}\t{user_id}\t{len(picked)}\t{correct}\t{score}\t"
+                    f"{test_data}\t{created_at}\t{passed}"
+                )
+
+        loaded("test_sessions", _copy(
+            cursor, "test_sessions",
+            ("id", "user_id", "total_questions", "correct_answers", "score_percentage",
+             "test_data", "created_at", "passed"),
+            session_lines(),
+        ))
+
+        for ddl in restore:
+            cursor.execute(ddl)
+        log(f"{'constraints':<15} {len(restore):>10} restored  "
+            f"{time.perf_counter() - started:5.1f} s")
+        for table in ("users", "materials", "tests"):
+            _reset_sequence(cursor, table)
+        raw.commit()
+    finally:
+        raw.close()
+
+    with Session(engine) as db:
+        progress_rollup.rebuild(db)
+        db.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    loaded("section_progress", _count(engine, models.SectionProgress.__tablename__))
+    return counts
+
+
+def _count(engine, table: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
@@ -0,0 +1,75 @@
+"""
+Final exam and material test logic, free of database and request objects.
+
+The routers load questions and save results; picking questions and grading
+answers happens here so it can be benchmarked on its own
+(benchmarks/micro.py).
+"""
+import random
+
+# Questions in the final exam, if the bank has that many
+EXAM_QUESTION_COUNT = 30
+# Minimum score (percent) to pass the final exam and get a certificate
+PASSING_THRESHOLD = 60
+
+
+def sample_questions(bank, count: int = EXAM_QUESTION_COUNT, rng=random):
+    """Random questions from ``bank`` in random order, options shuffled.
+
+    Correct answers are left out; the client gets only what it shows.
+    """
+    selected = rng.sample(bank, min(count, len(bank)))
+    questions = []
+    for question in selected:
+        options = list(question.options)
+        rng.shuffle(options)
+        questions.append(
+            {"id": question.id, "question": question.question, "options": options}
+        )
+    return questions
+
+
+def grade_exam(questions, answers: dict):
+    """Grade every exam question, answered or not.
+
+    ``answers`` maps question ids (as strings) to the chosen option. Returns
+    ``(results, correct_count, score_percentage, passed)``.
+    """
+    results = []
+    correct_count = 0
+    for question in questions:
+        user_answer = answers.get(str(question.id))  # None if not answered
+        is_correct = bool(user_answer) and user_answer == question.correct_answer
+        correct_count += is_correct
+        results.append({
+            "test_id": question.id,
+            "question": question.question,
+            "user_answer": user_answer,
+            "correct_answer": question.correct_answer,
+            "is_correct": is_correct,
+            "material_id": question.material_id,
+        })
+
+    total = len(results)
+    score_percentage = int(correct_count / total * 100) if total else 0
+    passed = 1 if score_percentage >= PASSING_THRESHOLD else 0
+    return results, correct_count, score_percentage, passed
+
+
+def grade_material_tests(tests, answers: dict):
+    """Grade a material's tests. Returns ``(results, correct_test_ids)``."""
+    results = []
+    correct_ids = []
+    for test in tests:
+        user_answer = answers.get(str(test.id))
+        is_correct = user_answer == test.correct_answer
+        if is_correct:
+            correct_ids.append(test.id)
+        results.append({
+            "test_id": test.id,
+            "question": test.question,
+            "user_answer": user_answer,
+            "correct_answer": test.correct_answer,
+            "is_correct": is_correct,
+        })
+    return results, correct_ids
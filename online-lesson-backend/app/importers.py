@@ -0,0 +1,137 @@
+"""
+Streaming readers for admin bulk imports (CSV / XLSX / JSON).
+
+``iter_rows`` yields ``(row_number, row)`` pairs one at a time, where
+``row`` maps lower-cased header names to cell values, so imports can
+validate and insert in batches without loading the whole file. JSON has no
+streaming parser in the standard library: the document (a list of objects)
+is parsed at once and its items are yielded like rows, numbered from 1.
+"""
+import codecs
+import csv
+import json
+import zipfile
+from itertools import islice
+
+from fastapi import HTTPException, UploadFile, status
+
+SUPPORTED_EXTENSIONS = ("csv", "xlsx")
+
+
+def file_format(upload: UploadFile, supported=SUPPORTED_EXTENSIONS) -> str:
+    extension = (upload.filename or "").rsplit(".", 1)[-1].lower()
+    if extension not in supported:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file type, expected one of: {', '.join(supported)}",
+        )
+    return extension
+
+
+def _normalize_header(header):
+    return [str(name).strip().lower() if name is not None else "" for name in header]
+
+
+def _clean(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _bad_file(detail: str):
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def _csv_reader(upload: UploadFile):
+    # utf-8-sig also accepts files saved by Excel with a BOM
+    return csv.reader(codecs.iterdecode(upload.file, "utf-8-sig"))
+
+
+def _check_csv(upload: UploadFile):
+    """Decode and parse the whole file once, so an undecodable or malformed
+    line is rejected before the import has written anything."""
+    reader = _csv_reader(upload)
+    try:
+        for _ in reader:
+            pass
+    except UnicodeDecodeError:
+        raise _bad_file(
+            f"CSV file is not UTF-8 encoded (near line {reader.line_num + 1}); "
+            "save it as CSV UTF-8"
+        )
+    except csv.Error as e:
+        raise _bad_file(f"Invalid CSV file (line {reader.line_num}): {e}")
+    upload.file.seek(0)
+
+
+def _csv_rows(upload: UploadFile):
+    _check_csv(upload)
+    reader = _csv_reader(upload)
+    header = _normalize_header(next(reader, []))
+    for row_number, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield row_number, {
+            name: _clean(value) for name, value in zip(header, values) if name
+        }
+
+
+def _xlsx_rows(upload: UploadFile):
+    from openpyxl import load_workbook  # only needed for XLSX uploads
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(upload.file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError):
+        raise _bad_file("Invalid XLSX file")
+    row_number = 1
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _normalize_header(next(rows, []))
+        for row_number, values in enumerate(rows, start=2):
+            if all(v is None or str(v).strip() == "" for v in values):
+                continue
+            yield row_number, {
+                name: _clean(value) for name, value in zip(header, values) if name
+            }
+    except (zipfile.BadZipFile, KeyError, OSError, SyntaxError):
+        # Sheets are parsed lazily: a damaged one fails mid-stream
+        raise _bad_file(f"Invalid XLSX file (after row {row_number})")
+    finally:
+        workbook.close()
+
+
+def _json_rows(upload: UploadFile):
+    try:
+        document = json.load(codecs.getreader("utf-8-sig")(upload.file))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON file"
+        )
+    if not isinstance(document, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a JSON list of objects",
+        )
+    for row_number, item in enumerate(document, start=1):
+        if not isinstance(item, dict):
+            yield row_number, {}
+            continue
+        yield row_number, {
+            str(name).strip().lower(): _clean(value) for name, value in item.items()
+        }
+
+
+def iter_rows(upload: UploadFile, fmt: str):
+    if fmt == "xlsx":
+        return _xlsx_rows(upload)
+    if fmt == "json":
+        return _json_rows(upload)
+    return _csv_rows(upload)
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,145 @@
+"""
+Per-request latency and SQL instrumentation.
+
+``InstrumentationMiddleware`` times every HTTP request and, through
+SQLAlchemy cursor events on all engines, counts the queries it ran and
+their time in the database. Per-route histograms are exported on
+``/metrics``. Each response gets a ``Server-Timing`` header (visible in the
+browser's dev tools), and requests running more than
+QUERY_ALARM_THRESHOLD queries are logged as likely N+1 patterns.
+
+Request stats live in a context variable. Threadpool handlers and
+dependencies run in a copy of the request's context, so they update the
+same stats object.
+"""
+import contextvars
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import metrics
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+request_duration = metrics.Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route",
+    labelnames=("method", "route", "status"),
+)
+request_queries = metrics.Histogram(
+    "http_request_queries",
+    "SQL statements per request by route",
+    labelnames=("method", "route"),
+    buckets=QUERY_BUCKETS,
+)
+request_db_seconds = metrics.Histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL statements per request by route",
+    labelnames=("method", "route"),
+)
+
+
+class RequestStats:
+    __slots__ = ("scope", "role", "queries", "db_seconds", "statements")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.role = None  # set once the bearer token has been verified
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = None  # [(sql, seconds)] when the request is profiled
+
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_stats():
+    """Stats of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._instrumentation_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_instrumentation_started", None)
+    if stats is not None and started is not None:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append((statement, elapsed))
+
+
+def route_name(scope) -> str:
+    """Route template such as ``/materials/{material_id}``, bounded cardinality."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+def _server_timing(total: float, stats: RequestStats) -> bytes:
+    return (
+        f'app;dur={total * 1000:.1f}, '
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+    ).encode("latin-1")
+
+
+class InstrumentationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers", ()))
+                    headers.append(
+                        (b"server-timing",
+                         _server_timing(time.perf_counter() - started, stats))
+                    )
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - started
+            method, route = scope["method"], route_name(scope)
+            request_duration.observe(
+                elapsed, method=method, route=route, status=status_code
+            )
+            request_queries.observe(stats.queries, method=method, route=route)
+            request_db_seconds.observe(stats.db_seconds, method=method, route=route)
+            threshold = settings.QUERY_ALARM_THRESHOLD
+            if threshold and stats.queries > threshold:
+                logger.warning(
+                    "%s %s ran %d SQL queries (%.1f ms in the database, "
+                    "%.1f ms total); threshold is %d",
+                    method,
+                    scope["path"],
+                    stats.queries,
+                    stats.db_seconds * 1000,
+                    elapsed * 1000,
+                    threshold,
+                )
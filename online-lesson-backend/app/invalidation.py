@@ -0,0 +1,164 @@
+"""
+Cross-process cache invalidation over Postgres LISTEN/NOTIFY.
+
+In-process caches (current users, catalog, question bank, leaderboard,
+read-after-write pins) subscribe a handler to a topic. ``publish`` runs the
+handlers in this process right away and NOTIFYs every other worker, on
+this node or another, whose listener thread then runs them too. Changes
+made through a session are queued with ``publish_on_commit`` and only go
+out once the transaction has committed.
+
+Notifications sent while a listener is disconnected are lost, so after
+reconnecting it calls every handler with ``key=None``, meaning "drop
+everything".
+"""
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import uuid
+
+import psycopg2
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+
+
+def _dsn():
+    url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+class InvalidationBus:
+    def __init__(self):
+        self.origin = None
+        self._handlers = {}  # topic -> [handler(key)]
+        self._stop = threading.Event()
+        self._thread = None
+        self._notify_conn = None
+        self._notify_lock = threading.Lock()
+
+    def subscribe(self, topic: str, handler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def _dispatch(self, topic: str, key):
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(key)
+            except Exception:
+                logger.exception("Invalidation handler for %r failed", topic)
+
+    def publish(self, topic: str, key=None):
+        self.publish_many([(topic, key)])
+
+    def publish_many(self, messages):
+        messages = list(messages)
+        for topic, key in messages:
+            self._dispatch(topic, key)
+        if self._thread is None:
+            return  # bus not started: a single process, nothing to tell
+        payloads = [
+            json.dumps({"origin": self.origin, "topic": topic, "key": key}, default=str)
+            for topic, key in messages
+        ]
+        # Dedicated connection: never competes with requests for the pool
+        with self._notify_lock:
+            try:
+                if self._notify_conn is None or self._notify_conn.closed:
+                    self._notify_conn = psycopg2.connect(_dsn())
+                    self._notify_conn.autocommit = True
+                with self._notify_conn.cursor() as cursor:
+                    for payload in payloads:
+                        cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+            except psycopg2.Error:
+                logger.exception("Could not notify other workers")
+                self._close_notify_conn()
+
+    def _close_notify_conn(self):
+        if self._notify_conn is not None:
+            self._notify_conn.close()
+            self._notify_conn = None
+
+    def _receive(self, notification):
+        try:
+            message = json.loads(notification.payload)
+        except ValueError:
+            logger.warning("Ignoring malformed invalidation %r", notification.payload)
+            return
+        if message.get("origin") != self.origin:
+            self._dispatch(message["topic"], message.get("key"))
+
+    def _listen(self):
+        conn = None
+        connected_before = False
+        while not self._stop.is_set():
+            try:
+                if conn is None:
+                    conn = psycopg2.connect(_dsn())
+                    conn.autocommit = True
+                    conn.cursor().execute(f"LISTEN {CHANNEL}")
+                    if connected_before:
+                        for topic in list(self._handlers):
+                            self._dispatch(topic, None)
+                    connected_before = True
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._receive(conn.notifies.pop(0))
+            except psycopg2.Error:
+                logger.warning("Invalidation listener disconnected", exc_info=True)
+                if conn is not None:
+                    conn.close()
+                conn = None
+                self._stop.wait(1.0)
+        if conn is not None:
+            conn.close()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # Set here rather than at import: preloaded workers are forked copies
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._listen, name="invalidation-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        with self._notify_lock:
+            self._close_notify_conn()
+
+
+bus = InvalidationBus()
+
+
+def publish_on_commit(session: Session, topic: str, key=None):
+    """Publish ``topic``/``key`` once the session's transaction commits."""
+    session.info.setdefault("pending_invalidations", set()).add((topic, key))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    pending = session.info.pop("pending_invalidations", None)
+    if pending:
+        bus.publish_many(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop("pending_invalidations", None)
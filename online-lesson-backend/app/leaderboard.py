@@ -0,0 +1,212 @@
+"""
+In-memory ranking of final test results.
+
+Every student is ranked by their best session: higher score_percentage
+first, earlier created_at breaking ties. For the whole course and for each
+faculty and direction we keep a histogram of scores (0-100) and a sorted
+top-K list. A student's rank and percentile come from the histogram, so
+they cost a constant 101-bucket sum instead of sorting the sessions.
+
+The state is loaded from the primary on first use and updated by
+``record`` on every submitted session, in all workers through the
+invalidation bus. Sessions published while the state is not loaded are
+kept and replayed after the load, as the load may not see them yet.
+"""
+import bisect
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from . import invalidation, models, schemas
+from .config import settings
+from .database import SessionLocal
+
+MAX_SCORE = 100
+
+Entry = namedtuple(
+    "Entry",
+    ["score", "created_at", "user_id", "firstname", "lastname", "faculty", "direction"],
+)
+
+
+def _sort_key(entry: Entry):
+    return (-entry.score, entry.created_at, entry.user_id)
+
+
+class _Cohort:
+    def __init__(self):
+        self.histogram = [0] * (MAX_SCORE + 1)
+        self.total = 0
+        self.top = []  # best first, at most settings.LEADERBOARD_TOP_K
+
+    def add(self, entry: Entry):
+        self.histogram[entry.score] += 1
+        self.total += 1
+        if len(self.top) < settings.LEADERBOARD_TOP_K or _sort_key(entry) < _sort_key(
+            self.top[-1]
+        ):
+            bisect.insort(self.top, entry, key=_sort_key)
+            del self.top[settings.LEADERBOARD_TOP_K:]
+
+    def remove(self, entry: Entry):
+        self.histogram[entry.score] -= 1
+        self.total -= 1
+        if entry in self.top:
+            self.top.remove(entry)
+
+    def position(self, score: int) -> dict:
+        higher = sum(self.histogram[score + 1:])
+        same = self.histogram[score]
+        below = self.total - higher - same
+        return {
+            "rank": higher + 1,
+            "total": self.total,
+            "percentile": round((below + same / 2) / self.total * 100, 2)
+            if self.total
+            else 0,
+        }
+
+
+def _cohort_keys(entry: Entry):
+    yield ("all", None)
+    if entry.faculty:
+        yield ("faculty", entry.faculty)
+    if entry.direction:
+        yield ("direction", entry.direction)
+
+
+class Leaderboard:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._best = {}  # user_id -> Entry
+        self._cohorts = {}
+        self._pending = {}  # user_id -> Entry published while not loaded
+
+    def _add(self, entry: Entry):
+        self._best[entry.user_id] = entry
+        for key in _cohort_keys(entry):
+            self._cohorts.setdefault(key, _Cohort()).add(entry)
+
+    def _remove(self, entry: Entry):
+        del self._best[entry.user_id]
+        for key in _cohort_keys(entry):
+            self._cohorts[key].remove(entry)
+
+    def _merge(self, entry: Entry):
+        previous = self._best.get(entry.user_id)
+        if previous is not None:
+            if _sort_key(previous) <= _sort_key(entry):
+                return
+            self._remove(previous)
+        self._add(entry)
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            # On the primary: a replica may lag behind the sessions just published
+            db = SessionLocal()
+            try:
+                # Best session per user, served by ix_test_sessions_user_score
+                rows = (
+                    db.query(
+                        models.TestSession.score_percentage,
+                        models.TestSession.created_at,
+                        models.User.id,
+                        models.User.firstname,
+                        models.User.lastname,
+                        models.User.faculty,
+                        models.User.direction,
+                    )
+                    .join(models.User, models.User.id == models.TestSession.user_id)
+                    .distinct(models.TestSession.user_id)
+                    .order_by(
+                        models.TestSession.user_id,
+                        models.TestSession.score_percentage.desc(),
+                        models.TestSession.created_at,
+                    )
+                    .all()
+                )
+            finally:
+                db.close()
+            self._best = {}
+            self._cohorts = {}
+            for row in rows:
+                self._add(Entry(*row))
+            for entry in self._pending.values():
+                self._merge(entry)
+            self._pending = {}
+            self._loaded = True
+
+    def reset(self):
+        """Drop the state; it is reloaded from the primary on next use."""
+        with self._lock:
+            self._loaded = False
+            self._best = {}
+            self._cohorts = {}
+
+    def record(self, session: models.TestSession, user: schemas.CurrentUser):
+        """Account for a newly submitted session, in every worker."""
+        entry = Entry(
+            session.score_percentage,
+            session.created_at,
+            user.id,
+            user.firstname,
+            user.lastname,
+            user.faculty,
+            user.direction,
+        )
+        invalidation.bus.publish("leaderboard", entry)
+
+    def _apply(self, entry):
+        if entry is None:
+            self.reset()  # missed notifications, reload from the database
+            return
+        entry = Entry(*entry)
+        if isinstance(entry.created_at, str):
+            entry = entry._replace(created_at=datetime.fromisoformat(entry.created_at))
+        with self._lock:
+            if not self._loaded:
+                # Replayed after the next load, which may not see it yet
+                previous = self._pending.get(entry.user_id)
+                if previous is None or _sort_key(entry) < _sort_key(previous):
+                    self._pending[entry.user_id] = entry
+                return
+            self._merge(entry)
+
+    def top(self, limit: int, faculty=None, direction=None):
+        """Best ``limit`` entries of a cohort, or None if more than top-K."""
+        if limit > settings.LEADERBOARD_TOP_K:
+            return None
+        with self._lock:
+            cohort = self._cohorts.get(_cohort_key(faculty, direction))
+            return list(cohort.top[:limit]) if cohort else []
+
+    def standing(self, user_id: int):
+        """Score, rank and percentile of a user overall and in their cohorts."""
+        with self._lock:
+            entry = self._best.get(user_id)
+            if entry is None:
+                return None
+            result = {"user_id": user_id, "score_percentage": entry.score}
+            for kind, value in _cohort_keys(entry):
+                result[kind] = {
+                    "name": value,
+                    **self._cohorts[(kind, value)].position(entry.score),
+                }
+            return result
+
+
+def _cohort_key(faculty=None, direction=None):
+    if faculty:
+        return ("faculty", faculty)
+    if direction:
+        return ("direction", direction)
+    return ("all", None)
+
+
+leaderboard = Leaderboard()
+invalidation.bus.subscribe("leaderboard", leaderboard._apply)
@@ -1,7 +1,13 @@
-from fastapi import FastAPI
+import hmac
+
+from anyio import to_thread
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from . import models
-from .database import engine, get_db
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from . import watch_events, admission, metrics, invalidation, instrumentation, profiling
+from . import slow_queries  # noqa: F401  registers the cursor event listeners
+from .config import settings
+from .database import async_engine
 from .routers import (
     user,
     auth,
@@ -10,10 +16,12 @@ from .routers import (
     test,
     progress_router,
     test_sessions,
+    admin,
+    leaderboard,
+    bootstrap,
 )
 
-models.Base.metadata.create_all(bind=engine)
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 
 @app.get("/")
@@ -21,6 +29,39 @@ def root():
     return {"Hello": "World"}
 
 
+def _check_metrics_token(request: Request):
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        token.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+# Latencies and pool state are internal: only served with METRICS_TOKEN set
+if settings.METRICS_TOKEN:
+
+    @app.get(
+        "/metrics",
+        include_in_schema=False,
+        dependencies=[Depends(_check_metrics_token)],
+    )
+    def get_metrics():
+        return PlainTextResponse(
+            metrics.render(), media_type="text/plain; version=0.0.4"
+        )
+
+
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(
+        admission.AdmissionControlMiddleware,
+        limits=admission.default_limits(),
+        buckets=admission.default_buckets(),
+    )
+
 origins = ["*"]
 app.add_middleware(
     CORSMiddleware,
@@ -28,8 +69,12 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"],
+    expose_headers=["Content-Disposition", "Server-Timing", "Retry-After"],
 )
+if settings.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+# Outermost, so latency includes admission control queueing
+app.add_middleware(instrumentation.InstrumentationMiddleware)
 
 app.include_router(user.router)
 app.include_router(auth.router)
@@ -38,46 +83,38 @@ app.include_router(materials.router)
 app.include_router(test.router)
 app.include_router(progress_router.router)
 app.include_router(test_sessions.router)
+app.include_router(admin.router)
+app.include_router(leaderboard.router)
+app.include_router(bootstrap.router)
 
 
-# Seed default sections on startup if empty
 @app.on_event("startup")
-def seed_sections():
-    from .models import Section
-    from .database import SessionLocal
-
-    db = SessionLocal()
-    admin = db.query(models.User).filter(models.User.role == "admin").first()
-    if not admin:
-        new_admin = models.User(
-            username="admin",
-            firstname="admin",
-            lastname="admin",
-            role="admin",
-            password="admin123",
-        )
-        db.add(new_admin)
-        db.commit()
-    try:
-        count = db.query(Section).count()
-        if count == 0:
-            defaults = [
-                {"name": "Maruza"},
-                {"name": "Amaliy"},
-                {"name": "Tajriba"},
-                {"name": "Mustaqil Ish"},
-                {"name": "Yakuniy Test"},
-            ]
-            for data in defaults:
-                db.add(Section(**data))
-            db.commit()
-        else:
-            # Check if "Yakuniy Test" exists, if not add it
-            yakuniy_test = (
-                db.query(Section).filter(Section.name == "Yakuniy Test").first()
-            )
-            if not yakuniy_test:
-                db.add(Section(name="Yakuniy Test"))
-                db.commit()
-    finally:
-        db.close()
+def size_threadpool():
+    # Threads running sync handlers; keep in line with the DB pool capacity
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+
+@app.on_event("startup")
+def start_watch_events_flusher():
+    watch_events.buffer.start()
+
+
+@app.on_event("shutdown")
+def stop_watch_events_flusher():
+    watch_events.buffer.stop()
+
+
+@app.on_event("startup")
+def start_invalidation_listener():
+    if settings.INVALIDATION_BUS_ENABLED:
+        invalidation.bus.start()
+
+
+@app.on_event("shutdown")
+def stop_invalidation_listener():
+    invalidation.bus.stop()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
@@ -10,6 +10,9 @@ from sqlalchemy import (
     func,
     UUID,
     Enum,
+    Float,
+    Index,
+    UniqueConstraint,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
@@ -23,8 +26,8 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     firstname = Column(String, nullable=False)
     lastname = Column(String, nullable=False)
-    faculty = Column(String, nullable=False)
-    direction = Column(String, nullable=False)
+    faculty = Column(String, nullable=False, index=True)
+    direction = Column(String, nullable=False, index=True)
     username = Column(String, nullable=False, unique=True)
     password = Column(String, nullable=False)
     role = Column(String, nullable=False)
@@ -35,6 +38,8 @@ class Section(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, nullable=False)
+    # Attachments + tests in this section, maintained by progress_rollup
+    total_items = Column(Integer, nullable=False, default=0, server_default="0")
 
     materials = relationship("Material", back_populates="section")
 
@@ -87,6 +92,12 @@ class Test(Base):
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
+    __table_args__ = (
+        UniqueConstraint("user_id", "test_id", name="uq_user_progress_user_test"),
+        UniqueConstraint(
+            "user_id", "attachment_id", name="uq_user_progress_user_attachment"
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
@@ -106,6 +117,45 @@ class UserProgress(Base):
     test = relationship("Test")
 
 
+class WatchProgress(Base):
+    """Merged video watch ranges per user and attachment (see watch_events)."""
+
+    __tablename__ = "watch_progress"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    attachment_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("attachments.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    position = Column(Float, nullable=False, default=0)  # last reported, seconds
+    duration = Column(Float, nullable=False, default=0)  # video length, seconds
+    watched_ranges = Column(JSONB, nullable=False, default=list)  # [[start, end]]
+    watched_seconds = Column(Float, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+
+class SectionProgress(Base):
+    """Per-user completed item count for a section (see progress_rollup)."""
+
+    __tablename__ = "section_progress"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    section_id = Column(
+        Integer, ForeignKey("sections.id", ondelete="CASCADE"), primary_key=True
+    )
+    completed_items = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(
+        TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    section = relationship("Section")
+
+
 class TestSession(Base):
     __tablename__ = "test_sessions"
 
@@ -120,3 +170,27 @@ class TestSession(Base):
 
     # Relationships
     user = relationship("User")
+
+
+# Leaderboard: global ranking and best session per user
+Index(
+    "ix_test_sessions_score_created",
+    TestSession.score_percentage.desc(),
+    TestSession.created_at,
+)
+Index(
+    "ix_test_sessions_user_score",
+    TestSession.user_id,
+    TestSession.score_percentage.desc(),
+    TestSession.created_at,
+)
+
+# Child rows by parent, in the order the routers list them; also keeps
+# cascading deletes and foreign key checks from scanning the child tables
+Index("ix_materials_section_id", Material.section_id, Material.id)
+Index("ix_tests_material_id", Test.material_id, Test.id)
+Index("ix_attachments_material_id", Attachment.material_id, Attachment.created_at)
+Index("ix_user_progress_test_id", UserProgress.test_id)
+Index("ix_user_progress_attachment_id", UserProgress.attachment_id)
+Index("ix_section_progress_section_id", SectionProgress.section_id)
+Index("ix_watch_progress_attachment_id", WatchProgress.attachment_id)
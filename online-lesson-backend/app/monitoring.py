@@ -0,0 +1,242 @@
+"""
+Live final exam counters for admins.
+
+``start_test_session`` and ``submit_test_session`` report to ``monitor``,
+which publishes the event on the invalidation bus so every worker keeps
+the same counters: per faculty, how many students have started the exam,
+how many are still writing it, how many submitted and the pass rate.
+
+Submissions are loaded from test_sessions on the primary on first use
+(and again after missed notifications); those published while they are
+not loaded are kept and replayed after the load. A started exam is
+not stored until it is submitted, so exams in progress exist only in
+memory: a worker that restarts sees only those started after it came up,
+and an exam not submitted within EXAM_MONITOR_STALE_AFTER_MINUTES stops
+counting as in progress.
+
+The admin streams (SSE and WebSocket, routers/admin.py) never query the
+database. Every EXAM_MONITOR_PUSH_INTERVAL_SECONDS each connection compares
+the monitor's version with the last one it sent; the JSON snapshot is built
+once per version and shared by all connections.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+import orjson
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+
+from . import invalidation, metrics, models, schemas
+from .config import settings
+from .database import SessionLocal
+
+
+class _Counts:
+    __slots__ = ("in_progress", "submitted", "passed")
+
+    def __init__(self):
+        self.in_progress = 0
+        self.submitted = 0
+        self.passed = 0
+
+    def as_dict(self):
+        return {
+            "started": self.in_progress + self.submitted,
+            "in_progress": self.in_progress,
+            "submitted": self.submitted,
+            "passed": self.passed,
+            "pass_rate": round(self.passed / self.submitted * 100, 2)
+            if self.submitted
+            else 0,
+        }
+
+
+class ExamMonitor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._submitted = set()  # user ids
+        self._pending = {}  # user_id -> (faculty, passed), submitted while unloaded
+        self._in_progress = {}  # user_id -> (faculty, started_at), oldest first
+        self._faculties = {}  # faculty -> _Counts
+        self.version = 0
+        self._snapshot = (-1, None)
+        self.streams = 0
+
+    def _counts(self, faculty) -> _Counts:
+        counts = self._faculties.get(faculty)
+        if counts is None:
+            counts = self._faculties[faculty] = _Counts()
+        return counts
+
+    def load(self):
+        """Load submissions if needed, on the primary: a replica may not have
+        the sessions whose notifications arrived before the load yet."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            db = SessionLocal()
+            try:
+                rows = (
+                    db.query(
+                        models.TestSession.user_id,
+                        models.User.faculty,
+                        func.max(models.TestSession.passed),
+                    )
+                    .join(models.User, models.User.id == models.TestSession.user_id)
+                    .group_by(models.TestSession.user_id, models.User.faculty)
+                    .all()
+                )
+            finally:
+                db.close()
+            for counts in self._faculties.values():
+                counts.submitted = counts.passed = 0
+            self._submitted = set()
+            submissions = [
+                (user_id, faculty, passed == 1) for user_id, faculty, passed in rows
+            ]
+            submissions += [
+                (user_id, faculty, passed)
+                for user_id, (faculty, passed) in self._pending.items()
+            ]
+            self._pending = {}
+            for user_id, faculty, passed in submissions:
+                if user_id in self._submitted:
+                    continue
+                self._submitted.add(user_id)
+                self._in_progress.pop(user_id, None)
+                counts = self._counts(faculty)
+                counts.submitted += 1
+                counts.passed += passed
+            for counts in self._faculties.values():
+                counts.in_progress = 0
+            for faculty, _ in self._in_progress.values():
+                self._counts(faculty).in_progress += 1
+            self._loaded = True
+            self.version += 1
+
+    def started(self, user: schemas.CurrentUser):
+        """Account for an exam handed out to ``user``, in every worker."""
+        invalidation.bus.publish("exam_monitor", {
+            "event": "started",
+            "user_id": user.id,
+            "faculty": user.faculty,
+            "at": time.time(),
+        })
+
+    def submitted(self, session: models.TestSession, user: schemas.CurrentUser):
+        """Account for a submitted exam, in every worker."""
+        invalidation.bus.publish("exam_monitor", {
+            "event": "submitted",
+            "user_id": user.id,
+            "faculty": user.faculty,
+            "passed": session.passed == 1,
+        })
+
+    def _apply(self, message):
+        with self._lock:
+            if message is None:
+                # Missed notifications: reload submissions on next use
+                self._loaded = False
+                return
+            user_id = message["user_id"]
+            if user_id in self._submitted:
+                return
+            previous = self._in_progress.pop(user_id, None)
+            if previous is not None:
+                self._counts(previous[0]).in_progress -= 1
+            counts = self._counts(message["faculty"])
+            if message["event"] == "started":
+                self._in_progress[user_id] = (message["faculty"], message["at"])
+                counts.in_progress += 1
+            elif self._loaded:
+                self._submitted.add(user_id)
+                counts.submitted += 1
+                counts.passed += message["passed"]
+            else:
+                # Replayed after the next load, which may not see it yet
+                passed = self._pending.get(user_id, (None, False))[1]
+                self._pending[user_id] = (
+                    message["faculty"], passed or message["passed"]
+                )
+            self.version += 1
+
+    def _expire(self):
+        cutoff = time.time() - settings.EXAM_MONITOR_STALE_AFTER_MINUTES * 60
+        expired = False
+        # Oldest first, so this stops at the first exam still in time
+        while self._in_progress:
+            user_id, (faculty, started_at) = next(iter(self._in_progress.items()))
+            if started_at >= cutoff:
+                break
+            del self._in_progress[user_id]
+            self._counts(faculty).in_progress -= 1
+            expired = True
+        if expired:
+            self.version += 1
+
+    def current_version(self) -> int:
+        with self._lock:
+            self._expire()
+            return self.version
+
+    def snapshot(self):
+        """(version, JSON bytes) of the counters, rebuilt only after a change."""
+        with self._lock:
+            self._expire()
+            version, payload = self._snapshot
+            if version == self.version:
+                return version, payload
+            total = _Counts()
+            by_faculty = []
+            for faculty in sorted(self._faculties, key=lambda f: f or ""):
+                counts = self._faculties[faculty]
+                total.in_progress += counts.in_progress
+                total.submitted += counts.submitted
+                total.passed += counts.passed
+                by_faculty.append({"faculty": faculty, **counts.as_dict()})
+            payload = orjson.dumps({
+                "version": self.version,
+                "generated_at": datetime.now(timezone.utc),
+                "total": total.as_dict(),
+                "by_faculty": by_faculty,
+            })
+            self._snapshot = (self.version, payload)
+            return self._snapshot
+
+    async def updates(self):
+        """Snapshots for one stream: the current one, then one per change at
+        most every push interval; ``None`` after a quiet heartbeat interval."""
+        interval = settings.EXAM_MONITOR_PUSH_INTERVAL_SECONDS
+        sent = None
+        quiet = 0.0
+        self.streams += 1
+        try:
+            while True:
+                if not self._loaded:
+                    await run_in_threadpool(self.load)
+                if self.current_version() != sent:
+                    sent, payload = self.snapshot()
+                    quiet = 0.0
+                    yield payload
+                elif quiet >= settings.EXAM_MONITOR_HEARTBEAT_SECONDS:
+                    quiet = 0.0
+                    yield None
+                await asyncio.sleep(interval)
+                quiet += interval
+        finally:
+            self.streams -= 1
+
+
+monitor = ExamMonitor()
+invalidation.bus.subscribe("exam_monitor", monitor._apply)
+
+metrics.Gauge(
+    "exam_monitor_streams",
+    "Admin exam monitoring streams connected to this process",
+    lambda: monitor.streams,
+)
@@ -1,13 +1,18 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 
 import jwt
 from fastapi import Depends, HTTPException
 from fastapi.security.oauth2 import OAuth2PasswordBearer
 from jwt import ExpiredSignatureError, InvalidTokenError
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from starlette import status
 
-from . import database, models, schemas
+from . import database, instrumentation, invalidation, models, schemas
+from .cache import TTLCache
 from .config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
@@ -15,6 +20,13 @@ SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
+# Decoded tokens keyed by token hash, and user rows keyed by id. Entries
+# live at most AUTH_CACHE_TTL_SECONDS (and never past the token's expiry);
+# user entries are dropped in every worker as soon as a change to the user
+# is committed (app/invalidation.py).
+token_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+user_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -24,7 +36,28 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
+def _credentials_exception():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _note_role(token_data: schemas.TokenData):
+    # Lets the slow-query log attribute statements to user roles
+    stats = instrumentation.current_stats()
+    if stats is not None:
+        stats.role = token_data.role
+
+
 def verify_access_token(token: str, credentials_exception):
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    token_data = token_cache.get(cache_key)
+    if token_data is not None:
+        _note_role(token_data)
+        return token_data
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         id: str = payload.get("user_id")
@@ -34,17 +67,107 @@ def verify_access_token(token: str, credentials_exception):
         token_data = schemas.TokenData(id=id, role=role)
     except (ExpiredSignatureError, InvalidTokenError):
         raise credentials_exception
+
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    token_cache.set(cache_key, token_data, ttl=expires_in)
+    _note_role(token_data)
     return token_data
 
 
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+) -> schemas.TokenData:
+    """Claims-only authentication: user id and role from the token, no DB.
+
+    Async so that async endpoints depending on it never hop to a thread.
+    """
+    return verify_access_token(token, _credentials_exception())
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)
 ):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    credentials_exception = _credentials_exception()
     access_token = verify_access_token(token, credentials_exception)
-    user = db.query(models.User).filter(models.User.id == access_token.id).first()
+
+    user = user_cache.get(access_token.id)
+    if user is None:
+        db_user = (
+            db.query(models.User).filter(models.User.id == access_token.id).first()
+        )
+        if db_user is None:
+            raise credentials_exception
+        # Detached snapshot: safe to share between requests and threads
+        user = schemas.CurrentUser.model_validate(db_user)
+        user_cache.set(user.id, user)
     return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(database.get_async_read_db),
+):
+    """``get_current_user`` for async endpoints, on their own read session."""
+    access_token = verify_access_token(token, _credentials_exception())
+
+    user = user_cache.get(access_token.id)
+    if user is None:
+        db_user = await db.scalar(
+            select(models.User).where(models.User.id == access_token.id)
+        )
+        if db_user is None:
+            raise _credentials_exception()
+        user = schemas.CurrentUser.model_validate(db_user)
+        user_cache.set(user.id, user)
+    return user
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, models.User):
+            invalidation.publish_on_commit(session, "user", obj.id)
+
+
+def _invalidate_user(user_id):
+    if user_id is None:
+        user_cache.clear()
+    else:
+        user_cache.pop(user_id)
+
+
+invalidation.bus.subscribe("user", _invalidate_user)
+
+
+def get_current_admin_user(
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Admin access required.",
+        )
+    return current_user
+
+
+_optional_bearer = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
+
+
+def verify_admin_token(token: str) -> schemas.TokenData:
+    """Claims-only admin check, no database; raises 401 / 403."""
+    principal = verify_access_token(token or "", _credentials_exception())
+    if principal.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Admin access required.",
+        )
+    return principal
+
+
+async def get_stream_admin(
+    header_token: str = Depends(_optional_bearer), token: str = None
+) -> schemas.TokenData:
+    """Admin for long-lived streams: the bearer header or ``?token=`` (browser
+    EventSource and WebSocket clients cannot set headers). Checked from the
+    token claims, so the stream holds no database session."""
+    return verify_admin_token(header_token or token)
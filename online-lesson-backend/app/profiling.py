@@ -0,0 +1,182 @@
+"""
+On-demand request profiling for admins.
+
+An admin adds ``X-Profile: 1`` (or ``?profile=1``) to a request. The user
+behind the bearer token is checked with ``get_current_admin_user``; for
+anyone else the flag is ignored and the request runs normally. A profiled
+request runs with a sampling profiler thread. Every PROFILE_SAMPLE_INTERVAL_MS
+it records:
+- the stack of the request's own task on the event loop, from this
+  middleware down;
+- the stacks of worker threads running the request's endpoint function.
+
+It also logs every SQL statement the request ran. The result is stored in a
+ring buffer of the last PROFILE_BUFFER_SIZE profiles, and its id is returned
+in the ``X-Profile-Id`` response header. Stacks are kept in folded format,
+ready for flamegraph.pl or speedscope.
+
+Requests without the flag only pay for a header lookup.
+"""
+import collections
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from . import instrumentation, oauth2
+from .config import settings
+from .database import SessionLocal
+
+profiles = collections.deque(maxlen=settings.PROFILE_BUFFER_SIZE)
+
+
+def get_profile(profile_id: str):
+    for profile in profiles:
+        if profile["id"] == profile_id:
+            return profile
+    return None
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def _stack_below(frame, root):
+    """Folded stack from ``root`` (a frame or code object) down to ``frame``."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        if frame is root or frame.f_code is root:
+            return ";".join(reversed(names))
+        frame = frame.f_back
+    return None
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, loop_thread_id, request_frame, scope):
+        super().__init__(name="request-profiler", daemon=True)
+        self.loop_thread_id = loop_thread_id
+        self.request_frame = request_frame
+        self.scope = scope
+        self.interval = settings.PROFILE_SAMPLE_INTERVAL_MS / 1000
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._finished = threading.Event()
+
+    def run(self):
+        while not self._finished.wait(self.interval):
+            endpoint = self.scope.get("endpoint")
+            endpoint_code = getattr(endpoint, "__code__", None)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                if thread_id == self.loop_thread_id:
+                    stack = _stack_below(frame, self.request_frame)
+                elif endpoint_code is not None:
+                    stack = _stack_below(frame, endpoint_code)
+                else:
+                    stack = None
+                if stack:
+                    self.stacks[stack] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._finished.set()
+        self.join()
+
+
+def _profile_requested(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile":
+            return value not in (b"", b"0", b"false")
+    query = scope.get("query_string", b"")
+    return b"profile=" in query and parse_qs(query.decode("latin-1")).get(
+        "profile", ["0"]
+    )[0] not in ("", "0", "false")
+
+
+def _bearer_token(scope):
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token if scheme.lower() == "bearer" and token else None
+    return None
+
+
+def _is_admin(token: str) -> bool:
+    db = SessionLocal()
+    try:
+        oauth2.get_current_admin_user(oauth2.get_current_user(token, db))
+        return True
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope):
+            return await self.app(scope, receive, send)
+        token = _bearer_token(scope)
+        if token is None or not await run_in_threadpool(_is_admin, token):
+            return await self.app(scope, receive, send)
+
+        profile_id = uuid.uuid4().hex[:12]
+        stats = instrumentation.current_stats()
+        if stats is not None:
+            stats.statements = []
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = _Sampler(threading.get_ident(), sys._getframe(), scope)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            self._store(profile_id, scope, sampler, time.perf_counter() - started, stats)
+
+    @staticmethod
+    def _store(profile_id, scope, sampler, elapsed, stats):
+        statements = (stats.statements or []) if stats is not None else []
+        functions = collections.Counter()
+        for stack, count in sampler.stacks.items():
+            functions[stack.rsplit(";", 1)[-1]] += count
+        profiles.append({
+            "id": profile_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": instrumentation.route_name(scope),
+            "duration_ms": round(elapsed * 1000, 2),
+            "sample_interval_ms": settings.PROFILE_SAMPLE_INTERVAL_MS,
+            "samples": sampler.samples,
+            "top_functions": [
+                {"function": name, "samples": count}
+                for name, count in functions.most_common(25)
+            ],
+            "folded": "\n".join(
+                f"{stack} {count}" for stack, count in sampler.stacks.most_common()
+            ),
+            "queries": [
+                {"sql": sql, "ms": round(seconds * 1000, 3)}
+                for sql, seconds in statements
+            ],
+        })
@@ -0,0 +1,259 @@
+"""
+Materialized per-user course progress.
+
+``sections.total_items`` holds how many attachments and tests a section
+contains, and ``section_progress`` holds how many of them each user has
+completed. Both are kept up to date incrementally by the routers that
+record completions or change course content, so a user's course progress
+is one row per section instead of a join over user_progress, attachments
+and tests.
+
+A user_progress row belongs to the section of its test's material, or of
+its attachment's material when it has no test.
+
+None of the helpers commit; they run inside the caller's transaction.
+"""
+from collections import Counter
+
+from sqlalchemy import func, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from . import models
+
+
+def _section_counts(db: Session, attachment_ids=(), test_ids=()) -> Counter:
+    """Number of the given attachments/tests per section id."""
+    counts = Counter()
+    if attachment_ids:
+        rows = (
+            db.query(models.Material.section_id, func.count(models.Attachment.id))
+            .join(models.Attachment, models.Attachment.material_id == models.Material.id)
+            .filter(models.Attachment.id.in_(attachment_ids))
+            .group_by(models.Material.section_id)
+            .all()
+        )
+        counts.update(dict(rows))
+    if test_ids:
+        rows = (
+            db.query(models.Material.section_id, func.count(models.Test.id))
+            .join(models.Test, models.Test.material_id == models.Material.id)
+            .filter(models.Test.id.in_(test_ids))
+            .group_by(models.Material.section_id)
+            .all()
+        )
+        counts.update(dict(rows))
+    counts.pop(None, None)
+    return counts
+
+
+def add_items(db: Session, section_id: int, count: int = 1):
+    """Adjust a section's item total after attachments/tests were added."""
+    if section_id is None or count == 0:
+        return
+    db.query(models.Section).filter(models.Section.id == section_id).update(
+        {models.Section.total_items: models.Section.total_items + count},
+        synchronize_session=False,
+    )
+
+
+def record_completions(db: Session, user_id: int, attachment_ids=(), test_ids=()):
+    """Count items that just became completed for a user.
+
+    Only pass items whose user_progress row changed from not completed to
+    completed, otherwise they are counted twice.
+    """
+    counts = _section_counts(db, attachment_ids, test_ids)
+    if not counts:
+        return
+
+    stmt = insert(models.SectionProgress).values(
+        [
+            {"user_id": user_id, "section_id": section_id, "completed_items": count}
+            for section_id, count in counts.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "section_id"],
+        set_={
+            "completed_items": models.SectionProgress.completed_items
+            + stmt.excluded.completed_items,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+
+def remove_items(db: Session, attachment_ids=(), test_ids=()):
+    """Uncount attachments/tests that are about to be deleted.
+
+    Must run before the rows are deleted: it reads their sections and the
+    user_progress rows that reference them.
+    """
+    attachment_ids = list(attachment_ids)
+    test_ids = list(test_ids)
+
+    for section_id, count in _section_counts(db, attachment_ids, test_ids).items():
+        add_items(db, section_id, -count)
+
+    completed = []
+    if test_ids:
+        completed.append(
+            select(models.UserProgress.user_id, models.Material.section_id)
+            .join(models.Test, models.Test.id == models.UserProgress.test_id)
+            .join(models.Material, models.Material.id == models.Test.material_id)
+            .where(
+                models.UserProgress.test_id.in_(test_ids),
+                models.UserProgress.is_completed == 1,
+            )
+        )
+    if attachment_ids:
+        completed.append(
+            select(models.UserProgress.user_id, models.Material.section_id)
+            .join(
+                models.Attachment,
+                models.Attachment.id == models.UserProgress.attachment_id,
+            )
+            .join(models.Material, models.Material.id == models.Attachment.material_id)
+            .where(
+                models.UserProgress.attachment_id.in_(attachment_ids),
+                models.UserProgress.test_id.is_(None),
+                models.UserProgress.is_completed == 1,
+            )
+        )
+    if not completed:
+        return
+
+    rows = union_all(*completed).subquery()
+    per_user = (
+        select(rows.c.user_id, rows.c.section_id, func.count().label("n"))
+        .group_by(rows.c.user_id, rows.c.section_id)
+        .subquery()
+    )
+    db.execute(
+        update(models.SectionProgress)
+        .where(
+            models.SectionProgress.user_id == per_user.c.user_id,
+            models.SectionProgress.section_id == per_user.c.section_id,
+        )
+        .values(
+            completed_items=models.SectionProgress.completed_items - per_user.c.n,
+            updated_at=func.now(),
+        ),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def rebuild(db: Session, section_ids=None):
+    """Recompute totals and per-user counts from the base tables.
+
+    Used when whole materials move between sections; ``None`` rebuilds every
+    section. Pending ORM changes must be flushed first.
+    """
+    if section_ids is not None:
+        section_ids = [s for s in set(section_ids) if s is not None]
+        if not section_ids:
+            return
+
+    attachment_count = (
+        select(func.count(models.Attachment.id))
+        .join(models.Material, models.Material.id == models.Attachment.material_id)
+        .where(models.Material.section_id == models.Section.id)
+        .scalar_subquery()
+    )
+    test_count = (
+        select(func.count(models.Test.id))
+        .join(models.Material, models.Material.id == models.Test.material_id)
+        .where(models.Material.section_id == models.Section.id)
+        .scalar_subquery()
+    )
+    totals = update(models.Section).values(total_items=attachment_count + test_count)
+    if section_ids is not None:
+        totals = totals.where(models.Section.id.in_(section_ids))
+    db.execute(totals, execution_options={"synchronize_session": False})
+
+    stale = db.query(models.SectionProgress)
+    if section_ids is not None:
+        stale = stale.filter(models.SectionProgress.section_id.in_(section_ids))
+    stale.delete(synchronize_session=False)
+
+    test_material = aliased(models.Material)
+    attachment_material = aliased(models.Material)
+    section_id = func.coalesce(test_material.section_id, attachment_material.section_id)
+    completed = (
+        select(models.UserProgress.user_id, section_id, func.count())
+        .outerjoin(models.Test, models.Test.id == models.UserProgress.test_id)
+        .outerjoin(test_material, test_material.id == models.Test.material_id)
+        .outerjoin(
+            models.Attachment, models.Attachment.id == models.UserProgress.attachment_id
+        )
+        .outerjoin(
+            attachment_material,
+            attachment_material.id == models.Attachment.material_id,
+        )
+        .where(models.UserProgress.is_completed == 1, section_id.is_not(None))
+        .group_by(models.UserProgress.user_id, section_id)
+    )
+    if section_ids is not None:
+        completed = completed.where(section_id.in_(section_ids))
+    db.execute(
+        insert(models.SectionProgress).from_select(
+            ["user_id", "section_id", "completed_items"], completed
+        )
+    )
+
+
+def _percentage(completed: int, total: int) -> float:
+    return round(completed / total * 100, 2) if total > 0 else 0
+
+
+def _summary_query(user_id: int):
+    return (
+        select(
+            models.Section.id,
+            models.Section.name,
+            models.Section.total_items,
+            func.coalesce(models.SectionProgress.completed_items, 0),
+        )
+        .outerjoin(
+            models.SectionProgress,
+            (models.SectionProgress.section_id == models.Section.id)
+            & (models.SectionProgress.user_id == user_id),
+        )
+        .order_by(models.Section.id)
+    )
+
+
+def user_summary(db: Session, user_id: int) -> dict:
+    """Per-section and overall progress of one user."""
+    return _summarize(user_id, db.execute(_summary_query(user_id)).all())
+
+
+async def user_summary_async(db: AsyncSession, user_id: int) -> dict:
+    """``user_summary`` on an async session."""
+    return _summarize(user_id, (await db.execute(_summary_query(user_id))).all())
+
+
+def _summarize(user_id: int, rows) -> dict:
+    sections = []
+    total_items = 0
+    completed_items = 0
+    for section_id, name, total, completed in rows:
+        total_items += total
+        completed_items += completed
+        sections.append({
+            "section_id": section_id,
+            "name": name,
+            "total_items": total,
+            "completed_items": completed,
+            "percentage": _percentage(completed, total),
+        })
+
+    return {
+        "user_id": user_id,
+        "total_items": total_items,
+        "completed_items": completed_items,
+        "percentage": _percentage(completed_items, total_items),
+        "sections": sections,
+    }
@@ -0,0 +1,74 @@
+"""
+In-process copy of the final exam question bank.
+
+Starting an exam samples 30 questions from every test in the database, and
+submitting grades answers against the same rows, so both read this cached
+copy instead of loading all tests on every request. The copy is rebuilt on
+first use after any test is added, changed or removed, in any worker.
+"""
+import threading
+from collections import namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import invalidation, models
+
+Question = namedtuple(
+    "Question", ["id", "question", "options", "correct_answer", "material_id"]
+)
+
+
+class QuestionBank:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._questions = None  # tuple of Question
+        self._by_id = None
+        self._generation = 0
+
+    def _snapshot(self, db: Session):
+        with self._lock:
+            if self._questions is not None:
+                return self._questions, self._by_id
+            generation = self._generation
+        rows = db.query(
+            models.Test.id,
+            models.Test.question,
+            models.Test.options,
+            models.Test.correct_answer,
+            models.Test.material_id,
+        ).order_by(models.Test.id)
+        questions = tuple(Question(*row) for row in rows)
+        by_id = {q.id: q for q in questions}
+        with self._lock:
+            # Don't keep it if the bank was invalidated while loading
+            if generation == self._generation:
+                self._questions, self._by_id = questions, by_id
+        return questions, by_id
+
+    def questions(self, db: Session):
+        """All questions, ordered by id."""
+        return self._snapshot(db)[0]
+
+    def get_many(self, db: Session, question_ids):
+        """Questions with the given ids, in order, skipping unknown ids."""
+        by_id = self._snapshot(db)[1]
+        return [by_id[i] for i in dict.fromkeys(question_ids) if i in by_id]
+
+    def invalidate(self, key=None):
+        with self._lock:
+            self._generation += 1
+            self._questions = None
+            self._by_id = None
+
+
+bank = QuestionBank()
+invalidation.bus.subscribe("question_bank", bank.invalidate)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tests(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, models.Test):
+            invalidation.publish_on_commit(session, "question_bank")
+            return
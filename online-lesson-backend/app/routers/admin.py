@@ -0,0 +1,443 @@
+import asyncio
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .. import models, schemas, database, export, profiling, slow_queries
+from ..monitoring import monitor
+from ..oauth2 import get_current_admin_user, get_stream_admin, verify_admin_token
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+# Rows fetched per round trip by the server-side cursors of the exports
+EXPORT_YIELD_PER = 1000
+
+
+def _filter_cohort(query, faculty: Optional[str], direction: Optional[str]):
+    query = query.filter(models.User.role == "user")
+    if faculty:
+        query = query.filter(models.User.faculty == faculty)
+    if direction:
+        query = query.filter(models.User.direction == direction)
+    return query
+
+
+# --- Course progress of a cohort (faculty / direction) ---
+@router.get("/progress/cohort", response_model=schemas.CohortProgress)
+def get_cohort_progress(
+    faculty: Optional[str] = None,
+    direction: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+    db: Session = Depends(database.get_read_db),
+    current_user: models.User = Depends(get_current_admin_user),
+):
+    """
+    Course progress of all students in a faculty and/or direction, read from
+    the section_progress rollup: per-section averages plus a page of students
+    ordered by completed items.
+    """
+    total_students = _filter_cohort(db.query(models.User), faculty, direction).count()
+    cohort_ids = _filter_cohort(db.query(models.User.id), faculty, direction)
+
+    sections = (
+        db.query(models.Section.id, models.Section.name, models.Section.total_items)
+        .order_by(models.Section.id)
+        .all()
+    )
+    total_items = sum(s.total_items for s in sections)
+
+    completed_by_section = dict(
+        db.query(
+            models.SectionProgress.section_id,
+            func.sum(models.SectionProgress.completed_items),
+        )
+        .filter(models.SectionProgress.user_id.in_(cohort_ids))
+        .group_by(models.SectionProgress.section_id)
+        .all()
+    )
+
+    section_rows = []
+    for s in sections:
+        completed = completed_by_section.get(s.id) or 0
+        average = completed / total_students if total_students else 0
+        section_rows.append({
+            "section_id": s.id,
+            "name": s.name,
+            "total_items": s.total_items,
+            "average_completed_items": round(average, 2),
+            "percentage": round(average / s.total_items * 100, 2)
+            if s.total_items
+            else 0,
+        })
+
+    completed_items = func.coalesce(func.sum(models.SectionProgress.completed_items), 0)
+    students = (
+        _filter_cohort(
+            db.query(
+                models.User.id,
+                models.User.username,
+                models.User.firstname,
+                models.User.lastname,
+                models.User.faculty,
+                models.User.direction,
+                completed_items.label("completed_items"),
+            ),
+            faculty,
+            direction,
+        )
+        .outerjoin(
+            models.SectionProgress, models.SectionProgress.user_id == models.User.id
+        )
+        .group_by(models.User.id)
+        .order_by(completed_items.desc(), models.User.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
+    return {
+        "total_students": total_students,
+        "total_items": total_items,
+        "sections": section_rows,
+        "students": [
+            {
+                "user_id": st.id,
+                "username": st.username,
+                "firstname": st.firstname,
+                "lastname": st.lastname,
+                "faculty": st.faculty,
+                "direction": st.direction,
+                "completed_items": st.completed_items,
+                "percentage": round(st.completed_items / total_items * 100, 2)
+                if total_items
+                else 0,
+            }
+            for st in students
+        ],
+    }
+
+
+def _export_response(fmt: str, filename: str, header, rows):
+    return StreamingResponse(
+        export.stream(fmt, header, rows),
+        media_type=export.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+def _progress_rows(faculty: Optional[str], direction: Optional[str]):
+    # The request's session is closed before the body is streamed, so the
+    # generator owns its own session.
+    db = database.ReadSessionLocal()
+    try:
+        attachment_counts = (
+            select(models.Attachment.material_id, func.count().label("n"))
+            .group_by(models.Attachment.material_id)
+            .subquery()
+        )
+        test_counts = (
+            select(models.Test.material_id, func.count().label("n"))
+            .group_by(models.Test.material_id)
+            .subquery()
+        )
+        materials = (
+            db.query(
+                models.Material.id,
+                models.Material.title,
+                models.Section.name,
+                func.coalesce(attachment_counts.c.n, 0)
+                + func.coalesce(test_counts.c.n, 0),
+            )
+            .outerjoin(models.Section, models.Section.id == models.Material.section_id)
+            .outerjoin(
+                attachment_counts, attachment_counts.c.material_id == models.Material.id
+            )
+            .outerjoin(test_counts, test_counts.c.material_id == models.Material.id)
+            .order_by(models.Material.section_id, models.Material.id)
+            .all()
+        )
+
+        users = _filter_cohort(
+            select(
+                models.User.id,
+                models.User.username,
+                models.User.firstname,
+                models.User.lastname,
+                models.User.faculty,
+                models.User.direction,
+            ),
+            faculty,
+            direction,
+        ).order_by(models.User.id)
+
+        material_id = func.coalesce(
+            models.Test.material_id, models.Attachment.material_id
+        )
+        completed = _filter_cohort(
+            select(models.UserProgress.user_id, material_id, func.count())
+            .join(models.User, models.User.id == models.UserProgress.user_id)
+            .outerjoin(models.Test, models.Test.id == models.UserProgress.test_id)
+            .outerjoin(
+                models.Attachment,
+                models.Attachment.id == models.UserProgress.attachment_id,
+            )
+            .where(models.UserProgress.is_completed == 1),
+            faculty,
+            direction,
+        ).group_by(models.UserProgress.user_id, material_id).order_by(
+            models.UserProgress.user_id
+        )
+
+        # Both cursors are ordered by user id and merged one user at a time
+        completed_rows = iter(
+            db.execute(completed.execution_options(yield_per=EXPORT_YIELD_PER))
+        )
+        pending = next(completed_rows, None)
+        for user in db.execute(users.execution_options(yield_per=EXPORT_YIELD_PER)):
+            done = {}
+            while pending is not None and pending[0] < user.id:
+                pending = next(completed_rows, None)
+            while pending is not None and pending[0] == user.id:
+                done[pending[1]] = pending[2]
+                pending = next(completed_rows, None)
+
+            for m_id, title, section_name, total in materials:
+                completed_items = done.get(m_id, 0)
+                yield (
+                    user.id,
+                    user.username,
+                    user.firstname,
+                    user.lastname,
+                    user.faculty,
+                    user.direction,
+                    section_name,
+                    m_id,
+                    title,
+                    completed_items,
+                    total,
+                    round(completed_items / total * 100, 2) if total else 0,
+                )
+    finally:
+        db.close()
+
+
+def _results_rows(faculty: Optional[str], direction: Optional[str]):
+    db = database.ReadSessionLocal()
+    try:
+        sessions = _filter_cohort(
+            select(
+                models.User.id,
+                models.User.username,
+                models.User.firstname,
+                models.User.lastname,
+                models.User.faculty,
+                models.User.direction,
+                models.TestSession.id,
+                models.TestSession.total_questions,
+                models.TestSession.correct_answers,
+                models.TestSession.score_percentage,
+                models.TestSession.passed,
+                models.TestSession.created_at,
+            ).join(models.User, models.User.id == models.TestSession.user_id),
+            faculty,
+            direction,
+        ).order_by(models.TestSession.created_at)
+
+        for row in db.execute(sessions.execution_options(yield_per=EXPORT_YIELD_PER)):
+            yield tuple(row)
+    finally:
+        db.close()
+
+
+# --- Export users x materials progress ---
+@router.get("/export/progress")
+def export_progress(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    faculty: Optional[str] = None,
+    direction: Optional[str] = None,
+    current_user: models.User = Depends(get_current_admin_user),
+):
+    """
+    Stream one row per student and material with completed/total items.
+    """
+    header = (
+        "user_id",
+        "username",
+        "firstname",
+        "lastname",
+        "faculty",
+        "direction",
+        "section",
+        "material_id",
+        "material",
+        "completed_items",
+        "total_items",
+        "percentage",
+    )
+    return _export_response(
+        fmt, "progress", header, _progress_rows(faculty, direction)
+    )
+
+
+# --- Export final test results ---
+@router.get("/export/results")
+def export_results(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    faculty: Optional[str] = None,
+    direction: Optional[str] = None,
+    current_user: models.User = Depends(get_current_admin_user),
+):
+    """
+    Stream every final test session with the student's details.
+    """
+    header = (
+        "user_id",
+        "username",
+        "firstname",
+        "lastname",
+        "faculty",
+        "direction",
+        "session_id",
+        "total_questions",
+        "correct_answers",
+        "score_percentage",
+        "passed",
+        "created_at",
+    )
+    return _export_response(fmt, "results", header, _results_rows(faculty, direction))
+
+
+# --- Request profiles (X-Profile: 1) ---
+@router.get("/profiles")
+def list_profiles(current_user: models.User = Depends(get_current_admin_user)):
+    """Profiles kept in this worker's ring buffer, newest first."""
+    return [
+        {key: profile[key] for key in (
+            "id", "created_at", "method", "path", "route", "duration_ms", "samples"
+        )}
+        | {"queries": len(profile["queries"])}
+        for profile in reversed(profiling.profiles)
+    ]
+
+
+def _profile_or_404(profile_id: str):
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str, current_user: models.User = Depends(get_current_admin_user)
+):
+    """Call tree summary (top functions by samples) and the request's SQL log."""
+    profile = _profile_or_404(profile_id)
+    return {key: value for key, value in profile.items() if key != "folded"}
+
+
+@router.get("/profiles/{profile_id}/folded")
+def download_profile_stacks(
+    profile_id: str, current_user: models.User = Depends(get_current_admin_user)
+):
+    """Folded stacks for flamegraph.pl, speedscope or inferno."""
+    profile = _profile_or_404(profile_id)
+    return PlainTextResponse(
+        profile["folded"] + "\n",
+        headers={
+            "Content-Disposition": f'attachment; filename="profile_{profile_id}.folded"'
+        },
+    )
+
+
+# --- Slow-query log ---
+@router.get("/slow-queries")
+def list_slow_queries(
+    sort: Literal["total_ms", "max_ms", "count"] = "total_ms",
+    limit: int = Query(50, ge=1, le=500),
+    current_user: models.User = Depends(get_current_admin_user),
+):
+    """
+    Statements slower than SLOW_QUERY_THRESHOLD_MS in this worker, grouped by
+    fingerprint, with the routes, roles and call sites that issued them.
+    """
+    return slow_queries.log.snapshot(sort=sort, limit=limit)
+
+
+@router.get("/slow-queries/{fingerprint}")
+def get_slow_query(
+    fingerprint: str, current_user: models.User = Depends(get_current_admin_user)
+):
+    entry = slow_queries.log.get(fingerprint)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Slow query not found")
+    return entry
+
+
+@router.delete("/slow-queries", status_code=204)
+def clear_slow_queries(current_user: models.User = Depends(get_current_admin_user)):
+    """Start over, e.g. after deploying a fix."""
+    slow_queries.log.clear()
+
+
+# --- Live final exam counters ---
+@router.get("/exam-monitor")
+def get_exam_monitor(current_user: models.User = Depends(get_current_admin_user)):
+    """Started / in progress / submitted / pass rate, overall and by faculty."""
+    monitor.load()
+    return Response(monitor.snapshot()[1], media_type="application/json")
+
+
+@router.get("/exam-monitor/stream")
+async def stream_exam_monitor(current_user: schemas.TokenData = Depends(get_stream_admin)):
+    """
+    Server-sent events: the counters of GET /admin/exam-monitor whenever they
+    change, at most every EXAM_MONITOR_PUSH_INTERVAL_SECONDS. Served from
+    memory (app/monitoring.py), so any number of watching admins cost the
+    database nothing.
+    """
+    await run_in_threadpool(monitor.load)
+
+    async def events():
+        async for payload in monitor.updates():
+            if payload is None:
+                yield b": keep-alive\n\n"
+            else:
+                yield b"data: " + payload + b"\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/exam-monitor/ws")
+async def exam_monitor_socket(websocket: WebSocket, token: str = ""):
+    """The stream of /admin/exam-monitor/stream over a WebSocket (?token=)."""
+    try:
+        verify_admin_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    await run_in_threadpool(monitor.load)
+
+    async def push():
+        async for payload in monitor.updates():
+            if payload is not None:
+                await websocket.send_bytes(payload)
+
+    pusher = asyncio.create_task(push())
+    try:
+        # Clients only listen; read until they disconnect
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        pusher.cancel()
+        await asyncio.gather(pusher, return_exceptions=True)
@@ -1,4 +1,5 @@
 from fastapi import Depends, HTTPException, status, APIRouter
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 
@@ -7,27 +8,45 @@ from .. import schemas, models, utils, oauth2, database
 router = APIRouter(tags=["auth"], prefix="/auth")
 
 
+def _get_user_by_username(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+
+def _save_password_hash(db: Session, user: models.User, password_hash: str):
+    user.password = password_hash
+    db.commit()
+
+
 @router.post("/login", response_model=schemas.Token)
-def login(user_credentials: schemas.UserLogin, db: Session = Depends(database.get_db)):
-    user = (
-        db.query(models.User)
-        .filter(models.User.username == user_credentials.username)
-        .first()
-    )
+async def login(user_credentials: schemas.UserLogin, db: Session = Depends(database.get_db)):
+    # DB work goes to the request threadpool, bcrypt to the password executor
+    user = await run_in_threadpool(_get_user_by_username, db, user_credentials.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Username yoki parol noto‘g‘ri",
         )
 
-    if not user_credentials.password == user.password:
+    try:
+        valid, new_hash = await utils.verify_and_update_async(
+            user_credentials.password, user.password
+        )
+    except utils.PasswordQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server band, birozdan so‘ng qayta urinib ko‘ring",
+            headers={"Retry-After": "1"},
+        )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Username yoki parol noto‘g‘ri",
         )
 
-    # if not utils.verify_password(user_credentials.password, user.password):
-    #     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
+    # Plaintext or outdated hash: store a fresh bcrypt hash
+    if new_hash:
+        await run_in_threadpool(_save_password_hash, db, user, new_hash)
+
     access_token = oauth2.create_access_token(
         {"user_id": user.id, "email": user.username, "role": user.role}
     )
@@ -0,0 +1,175 @@
+"""
+Composite read endpoints for the first paint of a page.
+
+Each returns everything a page needs in one response, on one read session,
+with a fixed number of queries however many materials there are:
+
+  /bootstrap/home                    user, sections, course progress, exam status
+  /bootstrap/section/{section_id}    user, section, material summaries and
+                                     the user's progress on every material
+  /bootstrap/material/{material_id}  user, material with tests and
+                                     attachments, the user's progress on it
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from .. import database, models, oauth2, progress_rollup, schemas
+from .progress_router import material_progress
+from .sections import get_sections
+from .test_sessions import check_test_status
+
+router = APIRouter(prefix="/bootstrap", tags=["bootstrap"])
+
+
+def _principal(user: schemas.CurrentUser) -> schemas.TokenData:
+    return schemas.TokenData(id=user.id, role=user.role)
+
+
+def _completed(user_id: int, test_ids, attachment_ids):
+    return select(models.UserProgress.attachment_id, models.UserProgress.test_id).where(
+        models.UserProgress.user_id == user_id,
+        models.UserProgress.is_completed == 1,
+        or_(
+            models.UserProgress.test_id.in_(test_ids),
+            models.UserProgress.attachment_id.in_(attachment_ids),
+        ),
+    )
+
+
+@router.get("/home", response_model=schemas.HomeBootstrap)
+async def home(
+    db: AsyncSession = Depends(database.get_async_read_db),
+    current_user: schemas.CurrentUser = Depends(oauth2.get_current_user_async),
+):
+    """Home page: at most 5 queries (sections are usually cached)."""
+    return {
+        "user": current_user,
+        "sections": await get_sections(db),
+        "progress": await progress_rollup.user_summary_async(db, current_user.id),
+        "test_status": await check_test_status(db, _principal(current_user)),
+    }
+
+
+@router.get("/section/{section_id}", response_model=schemas.SectionBootstrap)
+async def section_page(
+    section_id: int,
+    db: AsyncSession = Depends(database.get_async_read_db),
+    current_user: schemas.CurrentUser = Depends(oauth2.get_current_user_async),
+):
+    """Materials page: at most 5 queries, replacing one progress request per material."""
+    section = next((s for s in await get_sections(db) if s["id"] == section_id), None)
+    if section is None:
+        raise HTTPException(status_code=404, detail="Section not found")
+
+    material_ids = select(models.Material.id).where(
+        models.Material.section_id == section_id
+    )
+    materials = (
+        await db.execute(
+            select(models.Material.id, models.Material.section_id, models.Material.title)
+            .where(models.Material.section_id == section_id)
+            .order_by(models.Material.id)
+        )
+    ).all()
+    tests = (
+        await db.execute(
+            select(models.Test.id, models.Test.material_id)
+            .where(models.Test.material_id.in_(material_ids))
+        )
+    ).all()
+    attachments = (
+        await db.execute(
+            select(
+                models.Attachment.id,
+                models.Attachment.material_id,
+                models.Attachment.type,
+                models.Attachment.path,
+                models.Attachment.created_at,
+            )
+            .where(models.Attachment.material_id.in_(material_ids))
+        )
+    ).all()
+    completed = (
+        await db.execute(
+            _completed(
+                current_user.id,
+                select(models.Test.id).where(models.Test.material_id.in_(material_ids)),
+                select(models.Attachment.id).where(
+                    models.Attachment.material_id.in_(material_ids)
+                ),
+            )
+        )
+    ).all()
+    completed_attachments = {row.attachment_id for row in completed}
+    completed_test_ids = {row.test_id for row in completed}
+
+    tests_by_material = {m.id: [] for m in materials}
+    for test in tests:
+        tests_by_material[test.material_id].append(test.id)
+    attachments_by_material = {m.id: [] for m in materials}
+    for attachment in attachments:
+        attachments_by_material[attachment.material_id].append(attachment)
+
+    return {
+        "user": current_user,
+        "section": section,
+        "materials": [
+            {
+                "id": m.id,
+                "section_id": m.section_id,
+                "title": m.title,
+                "total_tests": len(tests_by_material[m.id]),
+                "total_attachments": len(attachments_by_material[m.id]),
+            }
+            for m in materials
+        ],
+        "progress": [
+            material_progress(
+                m.id,
+                attachments_by_material[m.id],
+                tests_by_material[m.id],
+                completed_attachments,
+                completed_test_ids,
+            )
+            for m in materials
+        ],
+    }
+
+
+@router.get("/material/{material_id}", response_model=schemas.MaterialBootstrap)
+async def material_page(
+    material_id: int,
+    db: AsyncSession = Depends(database.get_async_read_db),
+    current_user: schemas.CurrentUser = Depends(oauth2.get_current_user_async),
+):
+    """Material detail page: at most 5 queries."""
+    material = await db.scalar(
+        select(models.Material)
+        .options(
+            selectinload(models.Material.tests),
+            selectinload(models.Material.attachments),
+        )
+        .where(models.Material.id == material_id)
+    )
+    if not material:
+        raise HTTPException(status_code=404, detail="Material not found")
+
+    test_ids = [test.id for test in material.tests]
+    completed = (
+        await db.execute(
+            _completed(current_user.id, test_ids, [a.id for a in material.attachments])
+        )
+    ).all()
+    return {
+        "user": current_user,
+        "material": material,
+        "progress": material_progress(
+            material_id,
+            material.attachments,
+            test_ids,
+            {row.attachment_id for row in completed},
+            {row.test_id for row in completed},
+        ),
+    }
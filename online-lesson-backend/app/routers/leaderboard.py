@@ -0,0 +1,105 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from .. import models, schemas, database, oauth2
+from ..leaderboard import leaderboard
+from ..oauth2 import get_current_admin_user
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+# Largest page of /leaderboard/top; above LEADERBOARD_TOP_K it is read from the database
+MAX_TOP_LIMIT = 1000
+
+
+def _top_from_db(db: Session, limit: int, faculty=None, direction=None):
+    """Fallback for limits above the cached top-K."""
+    best = (
+        db.query(
+            models.TestSession.user_id,
+            models.TestSession.score_percentage,
+            models.TestSession.created_at,
+        )
+        .distinct(models.TestSession.user_id)
+        .order_by(
+            models.TestSession.user_id,
+            models.TestSession.score_percentage.desc(),
+            models.TestSession.created_at,
+        )
+        .subquery()
+    )
+    query = db.query(
+        best.c.score_percentage,
+        best.c.created_at,
+        models.User.id,
+        models.User.firstname,
+        models.User.lastname,
+        models.User.faculty,
+        models.User.direction,
+    ).join(models.User, models.User.id == best.c.user_id)
+    if faculty:
+        query = query.filter(models.User.faculty == faculty)
+    if direction:
+        query = query.filter(models.User.direction == direction)
+    return query.order_by(
+        best.c.score_percentage.desc(), best.c.created_at, models.User.id
+    ).limit(limit).all()
+
+
+# --- Top N students, overall or within a faculty / direction ---
+@router.get("/top", response_model=List[schemas.LeaderboardEntry])
+def get_top(
+    limit: int = Query(10, ge=1, le=MAX_TOP_LIMIT),
+    faculty: Optional[str] = None,
+    direction: Optional[str] = None,
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.TokenData = Depends(oauth2.get_current_principal),
+):
+    if faculty and direction:
+        raise HTTPException(
+            status_code=400, detail="Faqat faculty yoki direction bo'yicha saralash mumkin"
+        )
+    leaderboard.ensure_loaded()
+    entries = leaderboard.top(limit, faculty, direction)
+    if entries is None:
+        entries = _top_from_db(db, limit, faculty, direction)
+
+    return [
+        {
+            "rank": rank,
+            "user_id": e[2],
+            "firstname": e[3],
+            "lastname": e[4],
+            "faculty": e[5],
+            "direction": e[6],
+            "score_percentage": e[0],
+            "created_at": e[1],
+        }
+        for rank, e in enumerate(entries, start=1)
+    ]
+
+
+def _standing(user_id: int):
+    leaderboard.ensure_loaded()
+    standing = leaderboard.standing(user_id)
+    if standing is None:
+        raise HTTPException(status_code=404, detail="Yakuniy test natijasi topilmadi")
+    return standing
+
+
+# --- Current user's rank and percentile ---
+@router.get("/me", response_model=schemas.LeaderboardStanding)
+def get_my_standing(
+    current_user: schemas.TokenData = Depends(oauth2.get_current_principal),
+):
+    return _standing(current_user.id)
+
+
+# --- Any student's rank and percentile (admin) ---
+@router.get("/user/{user_id}", response_model=schemas.LeaderboardStanding)
+def get_user_standing(
+    user_id: int,
+    current_user: models.User = Depends(get_current_admin_user),
+):
+    return _standing(user_id)
@@ -2,11 +2,14 @@ import os
 import uuid
 import mimetypes
 
-from fastapi import APIRouter, Depends, HTTPException, Form, UploadFile, File, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Form, UploadFile, File
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from fastapi.responses import FileResponse
 from typing import List, Optional
-from .. import models, schemas, database, oauth2
+from .. import catalog, models, schemas, database, progress_rollup, serialization
+from ..oauth2 import get_current_admin_user
 
 router = APIRouter(prefix="/materials", tags=["materials"])
 
@@ -14,17 +17,6 @@ UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
-def get_current_admin_user(
-    current_user: models.User = Depends(oauth2.get_current_user),
-):
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions. Admin access required.",
-        )
-    return current_user
-
-
 # --- CREATE material + tests ---
 @router.post("/", response_model=schemas.Material)
 async def create_material(
@@ -45,6 +37,7 @@ async def create_material(
     db.add(db_material)
     db.commit()
     db.refresh(db_material)
+    new_items = 0
 
     # PDF attachment yaratish
     if pdf_file:
@@ -60,6 +53,7 @@ async def create_material(
             material_id=db_material.id,
         )
         db.add(db_attachment)
+        new_items += 1
 
     # Video attachment yaratish
     if video_type == "file" and video_file:
@@ -75,6 +69,7 @@ async def create_material(
             material_id=db_material.id,
         )
         db.add(db_attachment)
+        new_items += 1
     elif video_type == "youtube" and video_url:
         db_attachment = models.Attachment(
             id=uuid.uuid4(),
@@ -84,26 +79,83 @@ async def create_material(
             material_id=db_material.id,
         )
         db.add(db_attachment)
+        new_items += 1
 
+    progress_rollup.add_items(db, db_material.section_id, new_items)
     db.commit()
     db.refresh(db_material)
 
     return db_material
 
 
+# Materials with tests and attachments loaded in two extra queries
+def _materials_with_children():
+    return select(models.Material).options(
+        selectinload(models.Material.tests), selectinload(models.Material.attachments)
+    )
+
+
+def _columns(model, fields):
+    return [getattr(model, f) for f in fields]
+
+
 # --- GET materials by section ---
 @router.get("/sectionId/{section_id}", response_model=List[schemas.Material])
-def get_materials_by_section(section_id: int, db: Session = Depends(database.get_db)):
-    return (
-        db.query(models.Material).filter(models.Material.section_id == section_id).all()
-    )
+async def get_materials_by_section(
+    section_id: int, db: AsyncSession = Depends(database.get_async_read_db)
+):
+    # Encoded body is cached; rows are serialized without ORM objects
+    cache_key = ("materials", section_id)
+    body = catalog.cache.get(cache_key)
+    if body is None:
+        materials = serialization.rows_to_dicts(
+            serialization.MATERIAL_FIELDS,
+            await db.execute(
+                select(*_columns(models.Material, serialization.MATERIAL_FIELDS))
+                .where(models.Material.section_id == section_id)
+                .order_by(models.Material.id)
+            ),
+        )
+        by_id = {}
+        for material in materials:
+            material["tests"] = []
+            material["attachments"] = []
+            by_id[material["id"]] = material
+        # Literal ids give the planner per-material estimates: a small section
+        # reads ix_tests_material_id / ix_attachments_material_id
+        material_ids = list(by_id)
+        for test in serialization.rows_to_dicts(
+            serialization.TEST_FIELDS,
+            await db.execute(
+                select(*_columns(models.Test, serialization.TEST_FIELDS))
+                .where(models.Test.material_id.in_(material_ids))
+                .order_by(models.Test.id)
+            ),
+        ):
+            if test["material_id"] in by_id:
+                by_id[test["material_id"]]["tests"].append(test)
+        for attachment in serialization.rows_to_dicts(
+            serialization.ATTACHMENT_FIELDS,
+            await db.execute(
+                select(*_columns(models.Attachment, serialization.ATTACHMENT_FIELDS))
+                .where(models.Attachment.material_id.in_(material_ids))
+                .order_by(models.Attachment.created_at)
+            ),
+        ):
+            if attachment["material_id"] in by_id:
+                by_id[attachment["material_id"]]["attachments"].append(attachment)
+        body = serialization.json_bytes(materials)
+        catalog.cache.set(cache_key, body)
+    return serialization.raw_json_response(body)
 
 
 # --- GET single material ---
 @router.get("/{material_id}", response_model=schemas.Material)
-def get_material(material_id: int, db: Session = Depends(database.get_db)):
-    material = (
-        db.query(models.Material).filter(models.Material.id == material_id).first()
+async def get_material(
+    material_id: int, db: AsyncSession = Depends(database.get_async_read_db)
+):
+    material = await db.scalar(
+        _materials_with_children().where(models.Material.id == material_id)
     )
     if not material:
         raise HTTPException(status_code=404, detail="Material not found")
@@ -127,6 +179,8 @@ async def update_material(
     )
     if not db_material:
         raise HTTPException(status_code=404, detail="Material not found")
+    old_section_id = db_material.section_id
+    new_items = 0
 
     # PDF attachment yangilash - eski PDF attachmentlarni o'chirish
     if pdf_file:
@@ -140,6 +194,9 @@ async def update_material(
             )
             .all()
         )
+        progress_rollup.remove_items(
+            db, attachment_ids=[pdf_att.id for pdf_att in existing_pdfs]
+        )
         for pdf_att in existing_pdfs:
             db.delete(pdf_att)
 
@@ -156,6 +213,7 @@ async def update_material(
             material_id=material_id,
         )
         db.add(db_attachment)
+        new_items += 1
 
     # Video attachment yangilash - eski video attachmentlarni o'chirish
     if video_type:
@@ -181,6 +239,9 @@ async def update_material(
             )
             .all()
         )
+        progress_rollup.remove_items(
+            db, attachment_ids=[vid_att.id for vid_att in existing_videos + video_files]
+        )
         for vid_att in existing_videos + video_files:
             db.delete(vid_att)
 
@@ -197,6 +258,7 @@ async def update_material(
                 material_id=material_id,
             )
             db.add(db_attachment)
+            new_items += 1
         elif video_type == "youtube" and video_url:
             db_attachment = models.Attachment(
                 id=uuid.uuid4(),
@@ -206,10 +268,17 @@ async def update_material(
                 material_id=material_id,
             )
             db.add(db_attachment)
+            new_items += 1
+
+    progress_rollup.add_items(db, old_section_id, new_items)
 
     db_material.section_id = section_id
     if title:
         db_material.title = title
+    if section_id != old_section_id:
+        # The material's items and their completions move to another section
+        db.flush()
+        progress_rollup.rebuild(db, [old_section_id, section_id])
     db.commit()
     db.refresh(db_material)
     return db_material
@@ -228,13 +297,18 @@ def delete_material(
     if not db_material:
         raise HTTPException(status_code=404, detail="Material not found")
 
+    progress_rollup.remove_items(
+        db,
+        attachment_ids=[att.id for att in db_material.attachments],
+        test_ids=[test.id for test in db_material.tests],
+    )
     db.delete(db_material)
     db.commit()
     return {"message": f"Material {material_id} deleted successfully"}
 
 
 @router.get("/get_pdf/{material_id}")
-def get_material_pdf(material_id: int, db: Session = Depends(database.get_db)):
+def get_material_pdf(material_id: int, db: Session = Depends(database.get_read_db)):
     print("pdf endpoint")
     material = (
         db.query(models.Material).filter(models.Material.id == material_id).first()
@@ -270,7 +344,7 @@ def get_material_pdf(material_id: int, db: Session = Depends(database.get_db)):
 
 @router.get("/get_file/{attachment_id}")
 def get_file_by_attachment_id(
-    attachment_id: str, db: Session = Depends(database.get_db)
+    attachment_id: str, db: Session = Depends(database.get_read_db)
 ):
     """Download any file attachment by its ID"""
     try:
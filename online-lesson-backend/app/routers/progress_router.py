@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 import uuid
 
-from .. import models, schemas, database, oauth2
+from .. import models, schemas, database, oauth2, progress_rollup, watch_events, exam
+from ..config import settings
 
 router = APIRouter(
     prefix="/progress",
@@ -17,7 +21,7 @@ router = APIRouter(
 def mark_progress_complete(
         data: schemas.ProgressCreate,
         db: Session = Depends(database.get_db),
-        current_user: models.User = Depends(oauth2.get_current_user)
+        current_user: schemas.TokenData = Depends(oauth2.get_current_principal)
 ):
     """Mark attachment or test as completed for current user"""
     if not data.attachment_id and not data.test_id:
@@ -26,40 +30,77 @@ def mark_progress_complete(
     # Use current user's ID instead of data.user_id for security
     user_id = current_user.id
 
-    progress = (
-        db.query(models.UserProgress)
-        .filter(
-            models.UserProgress.user_id == user_id,
-            models.UserProgress.attachment_id == data.attachment_id,
-            models.UserProgress.test_id == data.test_id
-        )
-        .first()
+    # A test completion is keyed by (user_id, test_id), an attachment one by
+    # (user_id, attachment_id); both are unique in user_progress.
+    if data.test_id is not None:
+        conflict_columns = ["user_id", "test_id"]
+    else:
+        conflict_columns = ["user_id", "attachment_id"]
+
+    stmt = insert(models.UserProgress).values(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        attachment_id=data.attachment_id,
+        test_id=data.test_id,
+        is_completed=1,
+        completed_at=datetime.utcnow()
     )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=conflict_columns,
+        set_={"is_completed": 1, "completed_at": stmt.excluded.completed_at},
+        where=models.UserProgress.is_completed == 0
+    ).returning(models.UserProgress)
 
-    if progress:
-        progress.is_completed = 1
-        progress.completed_at = datetime.utcnow()
+    # A row comes back only when it was inserted or flipped to completed
+    progress = db.scalars(
+        stmt, execution_options={"populate_existing": True}
+    ).first()
+
+    if progress is not None:
+        if data.test_id is not None:
+            progress_rollup.record_completions(db, user_id, test_ids=[data.test_id])
+        else:
+            progress_rollup.record_completions(
+                db, user_id, attachment_ids=[data.attachment_id]
+            )
     else:
-        progress = models.UserProgress(
-            id=uuid.uuid4(),
-            user_id=user_id,
-            attachment_id=data.attachment_id,
-            test_id=data.test_id,
-            is_completed=1,
-            completed_at=datetime.utcnow()
+        # Already completed earlier, nothing changed
+        existing = db.query(models.UserProgress).filter(
+            models.UserProgress.user_id == user_id
         )
-        db.add(progress)
+        if data.test_id is not None:
+            existing = existing.filter(models.UserProgress.test_id == data.test_id)
+        else:
+            existing = existing.filter(
+                models.UserProgress.attachment_id == data.attachment_id
+            )
+        progress = existing.first()
 
     db.commit()
     db.refresh(progress)
     return progress
 
 
+@router.post("/events", status_code=202)
+async def ingest_watch_events(
+        batch: schemas.WatchEventBatch,
+        current_user: schemas.TokenData = Depends(oauth2.get_current_principal)
+):
+    """Queue video watch heartbeats; they are merged and written in bulk"""
+    if not watch_events.buffer.add(current_user.id, batch.events):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many pending watch events, retry later",
+            headers={"Retry-After": str(int(settings.WATCH_FLUSH_INTERVAL_SECONDS) + 1)}
+        )
+    return {"accepted": len(batch.events)}
+
+
 @router.post("/submit-test")
 def submit_test(
         submission: schemas.TestSubmission,
         db: Session = Depends(database.get_db),
-        current_user: models.User = Depends(oauth2.get_current_user)
+        current_user: schemas.TokenData = Depends(oauth2.get_current_principal)
 ):
     """Submit test answers and mark correct ones as completed"""
     user_id = current_user.id
@@ -72,74 +113,68 @@ def submit_test(
     if not tests:
         raise HTTPException(status_code=404, detail="Material not found or has no tests")
     
-    results = []
-    correct_count = 0
-    
-    for test in tests:
-        user_answer = answers.get(str(test.id))
-        is_correct = user_answer == test.correct_answer
-        
-        if is_correct:
-            correct_count += 1
-            # Mark test as completed
-            progress = (
-                db.query(models.UserProgress)
-                .filter(
-                    models.UserProgress.user_id == user_id,
-                    models.UserProgress.test_id == test.id
-                )
-                .first()
-            )
-            
-            if not progress:
-                progress = models.UserProgress(
-                    id=uuid.uuid4(),
-                    user_id=user_id,
-                    test_id=test.id,
-                    is_completed=1,
-                    completed_at=datetime.utcnow()
-                )
-                db.add(progress)
-            elif progress.is_completed == 0:
-                progress.is_completed = 1
-                progress.completed_at = datetime.utcnow()
-        
-        results.append({
-            "test_id": test.id,
-            "question": test.question,
-            "user_answer": user_answer,
-            "correct_answer": test.correct_answer,
-            "is_correct": is_correct
-        })
-    
+    results, correct_ids = exam.grade_material_tests(tests, answers)
+    completed_at = datetime.utcnow()
+    completed_rows = [
+        {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "test_id": test_id,
+            "is_completed": 1,
+            "completed_at": completed_at
+        }
+        for test_id in correct_ids
+    ]
+
+    # Mark all correctly answered tests as completed in one statement;
+    # already completed rows keep their original completed_at.
+    if completed_rows:
+        stmt = insert(models.UserProgress).values(completed_rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "test_id"],
+            set_={"is_completed": 1, "completed_at": stmt.excluded.completed_at},
+            where=models.UserProgress.is_completed == 0
+        ).returning(models.UserProgress.test_id)
+        newly_completed = db.scalars(stmt).all()
+        progress_rollup.record_completions(db, user_id, test_ids=newly_completed)
+
     db.commit()
-    
+
     return {
         "total_tests": len(tests),
-        "correct_count": correct_count,
+        "correct_count": len(completed_rows),
         "results": results
     }
 
 
-@router.get("/material/{material_id}", response_model=schemas.MaterialProgressResponse)
-def get_material_progress(
+@router.get("/summary", response_model=schemas.ProgressSummary)
+async def get_progress_summary(
+        db: AsyncSession = Depends(database.get_async_read_db),
+        current_user: schemas.TokenData = Depends(oauth2.get_current_principal)
+):
+    """Get current user's progress through the whole course, per section"""
+    return await progress_rollup.user_summary_async(db, current_user.id)
+
+
+def material_progress(
         material_id: int,
-        db: Session = Depends(database.get_db),
-        current_user: models.User = Depends(oauth2.get_current_user)
+        attachments,
+        test_ids,
+        completed_attachments: set,
+        completed_test_ids: set,
 ):
-    """Get user's progress for a specific material"""
-    user_id = current_user.id
-    
-    # Get material
-    material = db.query(models.Material).filter(models.Material.id == material_id).first()
-    if not material:
-        raise HTTPException(status_code=404, detail="Material not found")
-    
+    """Progress of one material (MaterialProgressResponse) from its items and
+    the ids the user has completed; shared with the bootstrap endpoints.
+
+    ``attachments`` need ``id``, ``type``, ``path`` and ``created_at``. They
+    are ordered here so every caller picks the same (latest) PDF and video
+    whatever order its query returned them in.
+    """
     # Get all attachments (PDF and video)
     pdf_attachment = None
     video_attachment = None
     
-    for att in material.attachments:
+    for att in sorted(attachments, key=lambda a: (a.created_at, a.id)):
         if att.type == models.AttachmentTypeEnum.file and att.path.lower().endswith('.pdf'):
             pdf_attachment = att
         elif att.type == models.AttachmentTypeEnum.link or (
@@ -147,55 +182,24 @@ def get_material_progress(
             any(att.path.lower().endswith(ext) for ext in ['.mp4', '.avi', '.mov', '.mkv'])
         ):
             video_attachment = att
-    
-    # Get progress for attachments
-    pdf_completed = False
-    video_completed = False
-    
-    if pdf_attachment:
-        pdf_progress = (
-            db.query(models.UserProgress)
-            .filter(
-                models.UserProgress.user_id == user_id,
-                models.UserProgress.attachment_id == pdf_attachment.id,
-                models.UserProgress.is_completed == 1
-            )
-            .first()
-        )
-        pdf_completed = pdf_progress is not None
-    
-    if video_attachment:
-        video_progress = (
-            db.query(models.UserProgress)
-            .filter(
-                models.UserProgress.user_id == user_id,
-                models.UserProgress.attachment_id == video_attachment.id,
-                models.UserProgress.is_completed == 1
-            )
-            .first()
-        )
-        video_completed = video_progress is not None
+
+    pdf_completed = bool(pdf_attachment) and pdf_attachment.id in completed_attachments
+    video_completed = (
+        bool(video_attachment) and video_attachment.id in completed_attachments
+    )
     
     # Get progress for tests
-    total_tests = len(material.tests)
+    total_tests = len(test_ids)
     completed_tests = 0
     
     test_progress_list = []
-    for test in material.tests:
-        test_progress = (
-            db.query(models.UserProgress)
-            .filter(
-                models.UserProgress.user_id == user_id,
-                models.UserProgress.test_id == test.id,
-                models.UserProgress.is_completed == 1
-            )
-            .first()
-        )
-        if test_progress:
+    for test_id in sorted(test_ids):
+        test_completed = test_id in completed_test_ids
+        if test_completed:
             completed_tests += 1
         test_progress_list.append({
-            "test_id": test.id,
-            "completed": test_progress is not None
+            "test_id": test_id,
+            "completed": test_completed
         })
     
     # Calculate percentage
@@ -228,3 +232,50 @@ def get_material_progress(
         "test_progress": test_progress_list,
         "percentage": round(percentage, 2)
     }
+
+
+@router.get("/material/{material_id}", response_model=schemas.MaterialProgressResponse)
+async def get_material_progress(
+        material_id: int,
+        db: AsyncSession = Depends(database.get_async_read_db),
+        current_user: schemas.TokenData = Depends(oauth2.get_current_principal)
+):
+    """Get user's progress for a specific material"""
+    user_id = current_user.id
+    
+    # Get material
+    material = await db.scalar(
+        select(models.Material)
+        .options(
+            selectinload(models.Material.tests),
+            selectinload(models.Material.attachments),
+        )
+        .where(models.Material.id == material_id)
+    )
+    if not material:
+        raise HTTPException(status_code=404, detail="Material not found")
+    
+    # Completed attachments and tests of this material, in one query
+    completed = (
+        await db.execute(
+            select(models.UserProgress.attachment_id, models.UserProgress.test_id)
+            .where(
+                models.UserProgress.user_id == user_id,
+                models.UserProgress.is_completed == 1,
+                or_(
+                    models.UserProgress.attachment_id.in_(
+                        [att.id for att in material.attachments]
+                    ),
+                    models.UserProgress.test_id.in_([test.id for test in material.tests]),
+                ),
+            )
+        )
+    ).all()
+
+    return material_progress(
+        material_id,
+        material.attachments,
+        [test.id for test in material.tests],
+        {row.attachment_id for row in completed},
+        {row.test_id for row in completed},
+    )
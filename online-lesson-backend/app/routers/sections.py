@@ -1,31 +1,54 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import models, schemas, database
+from .. import catalog, models, schemas, database
 
 router = APIRouter(prefix="/sections", tags=["sections"])
 
 
+def _sections_with_counts():
+    return (
+        select(
+            models.Section.id,
+            models.Section.name,
+            func.count(models.Material.id).label("materials"),
+        )
+        .outerjoin(models.Material, models.Material.section_id == models.Section.id)
+        .group_by(models.Section.id)
+        .order_by(models.Section.id)
+    )
+
+
 @router.get("/", response_model=List[schemas.Section])
-def get_sections(db: Session = Depends(database.get_db)):
-    sections = db.query(
-        models.Section.id, models.Section.name,
-        func.count(models.Material.id).label("materials")
-    ).outerjoin(models.Material, models.Material.section_id == models.Section.id).group_by(models.Section.id).order_by(
-        models.Section.id).all()
-
-    return [
+async def get_sections(db: AsyncSession = Depends(database.get_async_read_db)):
+    cached = catalog.cache.get("sections")
+    if cached is not None:
+        return cached
+    sections = await db.execute(_sections_with_counts())
+
+    result = [
         {"id": s.id, "name": s.name, "materials": s.materials}
         for s in sections
     ]
+    catalog.cache.set("sections", result)
+    return result
 
 
 @router.get("/{section_id}", response_model=schemas.Section)
-def get_section_by_id(section_id: str, db: Session = Depends(database.get_db)):
+async def get_section_by_id(
+    section_id: int, db: AsyncSession = Depends(database.get_async_read_db)
+):
     try:
-        return db.query(models.Section).filter(models.Section.id == section_id).first()
+        section = (
+            await db.execute(
+                _sections_with_counts().where(models.Section.id == section_id)
+            )
+        ).first()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}.")
+    if section is None:
+        raise HTTPException(status_code=404, detail="Section not found")
+    return {"id": section.id, "name": section.name, "materials": section.materials}
@@ -1,39 +1,223 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from collections import Counter
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from .. import models, schemas, database
-from typing import List
+from .. import (
+    models, schemas, database, progress_rollup, serialization, importers, invalidation
+)
+from ..oauth2 import get_current_admin_user
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/tests",
     tags=["tests"]
 )
 
+# Rows validated and inserted per multi-row INSERT by the bulk import
+IMPORT_BATCH_SIZE = 500
+IMPORT_FORMATS = ("csv", "xlsx", "json")
+# Separates the options of a row given in a single "options" cell
+OPTION_SEPARATOR = "|"
+
 
 # --- Create test ---
 @router.post("/", response_model=schemas.Test)
 def create_test(test: schemas.TestCreate, db: Session = Depends(database.get_db)):
     db_test = models.Test(**test.dict())
     db.add(db_test)
+    section_id = (
+        db.query(models.Material.section_id)
+        .filter(models.Material.id == test.material_id)
+        .scalar()
+    )
+    progress_rollup.add_items(db, section_id, 1)
     db.commit()
     db.refresh(db_test)
     return db_test
 
 
+# --- Bulk import ---
+def _integer(value, field: str) -> int:
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    try:
+        return int(str(value))
+    except ValueError:
+        raise ValueError(f"{field} must be an integer")
+
+
+def _row_options(row: dict) -> list:
+    options = row.get("options")
+    if options is None:
+        # One column per option (option_1, option_2, ... or option a, ...)
+        return [
+            value for name, value in row.items()
+            if name.startswith("option") and value is not None
+        ]
+    if isinstance(options, str):
+        if options.startswith("["):
+            try:
+                options = json.loads(options)
+            except ValueError:
+                raise ValueError("options: invalid JSON list")
+        else:
+            options = options.split(OPTION_SEPARATOR)
+    if not isinstance(options, list):
+        raise ValueError("options must be a list")
+    return options
+
+
+def _validate_test_row(row: dict, default_material_id: Optional[int]) -> schemas.TestCreate:
+    material_id = row.get("material_id")
+    if material_id is None:
+        material_id = default_material_id
+    if material_id is None:
+        raise ValueError("Missing material_id")
+    question = str(row.get("question") or "").strip()
+    if not question:
+        raise ValueError("Missing question")
+    correct_answer = str(row.get("correct_answer") or "").strip()
+    if not correct_answer:
+        raise ValueError("Missing correct_answer")
+
+    options = [str(option).strip() for option in _row_options(row) if option is not None]
+    if len(options) < 2 or not all(options):
+        raise ValueError("At least 2 non-empty options are required")
+    duplicates = [option for option, n in Counter(options).items() if n > 1]
+    if duplicates:
+        raise ValueError(f"Duplicate option: {duplicates[0]}")
+    if correct_answer not in options:
+        raise ValueError("correct_answer is not one of the options")
+
+    return schemas.TestCreate(
+        material_id=_integer(material_id, "material_id"),
+        question=question,
+        options=options,
+        correct_answer=correct_answer,
+    )
+
+
+def _load_materials(
+    db: Session, material_ids, looked_up: set, sections: dict, questions: set
+):
+    """Record the section of each existing material (which may be None) and
+    the questions it already has."""
+    material_ids = [m for m in material_ids if m not in looked_up]
+    if not material_ids:
+        return
+    looked_up.update(material_ids)
+    sections.update(
+        db.query(models.Material.id, models.Material.section_id)
+        .filter(models.Material.id.in_(material_ids))
+        .all()
+    )
+    questions.update(
+        db.query(models.Test.material_id, models.Test.question)
+        .filter(models.Test.material_id.in_(material_ids))
+        .all()
+    )
+
+
+@router.post("/import", response_model=schemas.TestImportReport)
+def import_tests(
+    file: UploadFile = File(...),
+    material_id: Optional[int] = Form(None),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_admin_user),
+):
+    """
+    Bulk-create questions from a CSV, XLSX or JSON file with the fields
+    material_id, question, options and correct_answer. ``options`` is a JSON
+    list, a "|"-separated cell or one column per option (option_1, ...);
+    ``material_id`` may be omitted from the rows and given as a form field.
+    Rows are validated as they are read and inserted in batches, all in one
+    transaction; invalid rows and questions already in the material are
+    reported per row and skipped.
+    """
+    fmt = importers.file_format(file, IMPORT_FORMATS)
+    report = {"total_rows": 0, "created": 0, "failed": 0, "rows": []}
+    looked_up = set()  # material ids already fetched
+    sections = {}  # material_id -> section_id of the existing ones
+    questions = set()  # (material_id, question) existing or imported
+    added_by_section = Counter()
+
+    def fail(row_number, error, material_id=None):
+        report["rows"].append({
+            "row": row_number, "status": "failed", "material_id": material_id, "error": error,
+        })
+
+    for rows in importers.batched(importers.iter_rows(file, fmt), IMPORT_BATCH_SIZE):
+        valid = []
+        for row_number, row in rows:
+            report["total_rows"] += 1
+            try:
+                valid.append((row_number, _validate_test_row(row, material_id)))
+            except ValueError as e:
+                fail(row_number, str(e))
+
+        _load_materials(db, {t.material_id for _, t in valid}, looked_up, sections, questions)
+        batch = []
+        for row_number, test in valid:
+            key = (test.material_id, test.question)
+            if test.material_id not in sections:
+                fail(row_number, "Material not found", test.material_id)
+            elif key in questions:
+                fail(row_number, "Duplicate question", test.material_id)
+            else:
+                questions.add(key)
+                batch.append((row_number, test))
+        if not batch:
+            continue
+
+        # executemany with RETURNING: one multi-row INSERT, ids in row order
+        test_ids = db.scalars(
+            insert(models.Test).returning(models.Test.id, sort_by_parameter_order=True),
+            [test.dict() for _, test in batch],
+        ).all()
+        for (row_number, test), test_id in zip(batch, test_ids):
+            report["rows"].append({
+                "row": row_number, "status": "created",
+                "material_id": test.material_id, "test_id": test_id,
+            })
+            added_by_section[sections[test.material_id]] += 1
+
+    if added_by_section:
+        for section_id, count in added_by_section.items():
+            # Materials without a section have no rollup to adjust (None is skipped)
+            progress_rollup.add_items(db, section_id, count)
+        # Core inserts skip the flush hooks that invalidate these caches
+        invalidation.publish_on_commit(db, "question_bank")
+        invalidation.publish_on_commit(db, "catalog")
+        db.commit()
+
+    report["rows"].sort(key=lambda r: r["row"])
+    report["created"] = sum(added_by_section.values())
+    report["failed"] = report["total_rows"] - report["created"]
+    return report
+
+
 # --- Get all tests ---
 @router.get("/", response_model=List[schemas.Test])
-def get_all_tests(db: Session = Depends(database.get_db)):
-    return db.query(models.Test).all()
+def get_all_tests(db: Session = Depends(database.get_read_db)):
+    rows = db.query(*(getattr(models.Test, f) for f in serialization.TEST_FIELDS)).order_by(
+        models.Test.id
+    )
+    return serialization.raw_json_response(
+        serialization.json_bytes(serialization.rows_to_dicts(serialization.TEST_FIELDS, rows))
+    )
 
 
 # --- Get tests by material_id ---
 @router.get("/material/{material_id}", response_model=List[schemas.Test])
-def get_tests_by_material(material_id: int, db: Session = Depends(database.get_db)):
+def get_tests_by_material(material_id: int, db: Session = Depends(database.get_read_db)):
     return db.query(models.Test).filter(models.Test.material_id == material_id).all()
 
 
 # --- Get single test ---
 @router.get("/{test_id}", response_model=schemas.Test)
-def get_test(test_id: int, db: Session = Depends(database.get_db)):
+def get_test(test_id: int, db: Session = Depends(database.get_read_db)):
     test = db.query(models.Test).filter(models.Test.id == test_id).first()
     if not test:
         raise HTTPException(status_code=404, detail="Test not found")
@@ -47,9 +231,19 @@ def update_test(test_id: int, updated_test: schemas.TestCreate, db: Session = De
     if not db_test:
         raise HTTPException(status_code=404, detail="Test not found")
 
+    old_material_id = db_test.material_id
     for key, value in updated_test.dict().items():
         setattr(db_test, key, value)
 
+    if db_test.material_id != old_material_id:
+        # The test (and its completions) may now belong to another section
+        db.flush()
+        section_ids = (
+            db.query(models.Material.section_id)
+            .filter(models.Material.id.in_([old_material_id, db_test.material_id]))
+            .all()
+        )
+        progress_rollup.rebuild(db, [s.section_id for s in section_ids])
     db.commit()
     db.refresh(db_test)
     return db_test
@@ -62,6 +256,7 @@ def delete_test(test_id: int, db: Session = Depends(database.get_db)):
     if not db_test:
         raise HTTPException(status_code=404, detail="Test not found")
 
+    progress_rollup.remove_items(db, test_ids=[test_id])
     db.delete(db_test)
     db.commit()
     return {"message": f"Test {test_id} deleted successfully"}
@@ -1,19 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import FileResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import List
 import uuid
-import random
 import os
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph, Frame
 
-from .. import models, schemas, database, oauth2
+from .. import models, schemas, database, oauth2, question_bank, exam
+from ..certificate import render_certificate
+from ..leaderboard import leaderboard
+from ..monitoring import monitor
 
 router = APIRouter(prefix="/test-sessions", tags=["test-sessions"])
 
@@ -22,7 +20,7 @@ router = APIRouter(prefix="/test-sessions", tags=["test-sessions"])
 def start_test_session(
     session_data: schemas.TestSessionCreate,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: schemas.CurrentUser = Depends(oauth2.get_current_user),
 ):
     """
     Start a new test session with random questions.
@@ -42,44 +40,20 @@ def start_test_session(
             detail="Siz allaqachon yakuniy testni topshirgansiz. Faqat bir marta topshirish mumkin.",
         )
 
-    # Get all available tests from the database
-    all_tests = db.query(models.Test).all()
+    # Get all available tests (cached question bank)
+    all_tests = question_bank.bank.questions(db)
 
     if len(all_tests) == 0:
         raise HTTPException(status_code=400, detail="Hozircha testlar mavjud emas")
 
-    # Use minimum of 30 or all available tests
-    num_questions = min(30, len(all_tests))
-
-    # Randomly select tests
-    selected_tests = random.sample(all_tests, num_questions)
-
-    # Shuffle the order
-    random.shuffle(selected_tests)
-
-    # Prepare questions for frontend (without correct answers)
-    questions = []
-    test_mapping = {}  # Store test_id -> correct_answer mapping
-
-    for test in selected_tests:
-        # Shuffle options for each question
-        options = test.options.copy()
-        random.shuffle(options)
-
-        questions.append({"id": test.id, "question": test.question, "options": options})
-
-        test_mapping[str(test.id)] = {
-            "correct_answer": test.correct_answer,
-            "question": test.question,
-            "material_id": test.material_id,
-        }
+    # Up to 30 random questions in random order, options shuffled
+    questions = exam.sample_questions(all_tests)
 
     # Create a temporary session ID (we'll save results when submitted)
     session_id = uuid.uuid4()
 
-    # Store session data temporarily in cache or return it
-    # For now, we'll return the session_id and questions
-    # The test_mapping will be reconstructed when checking answers
+    # Answers are graded against the question bank when submitted
+    monitor.started(current_user)
 
     return {"session_id": session_id, "questions": questions}
 
@@ -98,46 +72,14 @@ def submit_test_session(
     question_ids = submission.question_ids
 
     # Get ALL tests that were in the session (not just answered ones)
-    tests = db.query(models.Test).filter(models.Test.id.in_(question_ids)).all()
+    tests = question_bank.bank.get_many(db, question_ids)
 
     if not tests:
         raise HTTPException(status_code=404, detail="Tests not found")
 
-    # Create a mapping of test_id to test object
-    test_map = {test.id: test for test in tests}
-
-    # Check answers and calculate score for ALL questions
-    results = []
-    correct_count = 0
-
-    # Process ALL questions in the session
-    for test in tests:
-        user_answer = answers.get(str(test.id))  # May be None if not answered
-        is_correct = user_answer == test.correct_answer if user_answer else False
-
-        if is_correct:
-            correct_count += 1
-
-        results.append(
-            {
-                "test_id": test.id,
-                "question": test.question,
-                "user_answer": user_answer,
-                "correct_answer": test.correct_answer,
-                "is_correct": is_correct,
-                "material_id": test.material_id,
-            }
-        )
-
-    # Total questions is ALL questions in the session, not just answered ones
+    # Grade ALL questions in the session, not just the answered ones
+    results, correct_count, score_percentage, passed = exam.grade_exam(tests, answers)
     total_questions = len(tests)
-    score_percentage = (
-        int((correct_count / total_questions) * 100) if total_questions > 0 else 0
-    )
-
-    # Determine if user passed (≥60%)
-    PASSING_THRESHOLD = 60
-    passed = 1 if score_percentage >= PASSING_THRESHOLD else 0
 
     # Save test session to database
     test_session = models.TestSession(
@@ -154,6 +96,8 @@ def submit_test_session(
     db.add(test_session)
     db.commit()
     db.refresh(test_session)
+    leaderboard.record(test_session, current_user)
+    monitor.submitted(test_session, current_user)
 
     return test_session
 
@@ -161,8 +105,8 @@ def submit_test_session(
 @router.get("/history", response_model=schemas.TestSessionHistory)
 def get_test_history(
     limit: int = 10,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.TokenData = Depends(oauth2.get_current_principal),
 ):
     """
     Get user's test session history.
@@ -181,8 +125,8 @@ def get_test_history(
 @router.get("/{session_id}", response_model=schemas.TestSessionResult)
 def get_test_session(
     session_id: str,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.TokenData = Depends(oauth2.get_current_principal),
 ):
     """
     Get a specific test session result.
@@ -202,32 +146,32 @@ def get_test_session(
     return session
 
 
-@router.get("/check/status")
-def check_test_status(
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+@router.get("/check/status", response_model=schemas.TestStatus)
+async def check_test_status(
+    db: AsyncSession = Depends(database.get_async_read_db),
+    current_user: schemas.TokenData = Depends(oauth2.get_current_principal),
 ):
     """
     Check if user has already taken the test and get available test count.
     """
     # Check if user has already taken the test
-    existing_session = (
-        db.query(models.TestSession)
-        .filter(models.TestSession.user_id == current_user.id)
-        .first()
+    existing_session_id = await db.scalar(
+        select(models.TestSession.id)
+        .where(models.TestSession.user_id == current_user.id)
+        .limit(1)
     )
 
     # Get total available tests
-    total_tests = db.query(models.Test).count()
+    total_tests = await db.scalar(select(func.count(models.Test.id)))
 
     # Calculate how many questions will be in the test
-    test_question_count = min(30, total_tests)
+    test_question_count = min(exam.EXAM_QUESTION_COUNT, total_tests)
 
     return {
-        "has_taken_test": existing_session is not None,
+        "has_taken_test": existing_session_id is not None,
         "total_available_tests": total_tests,
         "test_question_count": test_question_count,
-        "existing_session_id": str(existing_session.id) if existing_session else None,
+        "existing_session_id": str(existing_session_id) if existing_session_id else None,
     }
 
 
@@ -264,108 +208,16 @@ def generate_certificate(
     cert_dir = "certificates"
     os.makedirs(cert_dir, exist_ok=True)
 
-    # Generate PDF filename
     pdf_filename = f"{cert_dir}/certificate_{session_id}.pdf"
-
-    # Create PDF
-    c = canvas.Canvas(pdf_filename, pagesize=A4)
-    width, height = A4
-
-    # Set colors and fonts
-    c.setFillColor(colors.HexColor("#012c6e"))  # Dark blue
-
-    # Draw border
-    c.setStrokeColor(colors.HexColor("#faad14"))  # Gold
-    c.setLineWidth(3)
-    c.rect(30, 30, width - 60, height - 60, stroke=1, fill=0)
-
-    # Draw inner border
-    c.setStrokeColor(colors.HexColor("#012c6e"))
-    c.setLineWidth(1)
-    c.rect(40, 40, width - 80, height - 80, stroke=1, fill=0)
-
-    # Title
-    c.setFont("Helvetica-Bold", 36)
-    c.setFillColor(colors.HexColor("#012c6e"))
-    c.drawCentredString(width / 2, height - 120, "SERTIFIKAT")
-
-    # Subtitle
-    c.setFont("Helvetica", 16)
-    c.setFillColor(colors.HexColor("#666666"))
-    c.drawCentredString(width / 2, height - 150, "Yakuniy Test Natijalari")
-
-    # Horizontal line
-    c.setStrokeColor(colors.HexColor("#faad14"))
-    c.setLineWidth(2)
-    c.line(100, height - 170, width - 100, height - 170)
-
-    # Certificate text
-    c.setFont("Helvetica", 14)
-    c.setFillColor(colors.black)
-
-    # "This certifies that"
-    c.drawCentredString(
-        width / 2, height - 220, "Ushbu sertifikat quyidagi shaxsga beriladi:"
-    )
-
-    # User name
-    c.setFont("Helvetica-Bold", 24)
-    c.setFillColor(colors.HexColor("#012c6e"))
     full_name = f"{current_user.firstname} {current_user.lastname}"
-    c.drawCentredString(width / 2, height - 270, full_name)
-
-    # Achievement text
-    c.setFont("Helvetica", 14)
-    c.setFillColor(colors.black)
-    c.drawCentredString(
-        width / 2, height - 320, "Yakuniy testni muvaffaqiyatli yakunladi"
-    )
-
-    # Test results box
-    c.setFillColor(colors.HexColor("#f0f0f0"))
-    c.rect(150, height - 450, width - 300, 100, stroke=0, fill=1)
-
-    # Results
-    c.setFont("Helvetica-Bold", 16)
-    c.setFillColor(colors.HexColor("#012c6e"))
-    c.drawCentredString(width / 2, height - 380, "Natijalar:")
-
-    c.setFont("Helvetica", 14)
-    c.setFillColor(colors.black)
-    result_text = (
-        f"To'g'ri javoblar: {session.correct_answers} / {session.total_questions}"
-    )
-    c.drawCentredString(width / 2, height - 410, result_text)
-
-    score_text = f"Natija: {session.score_percentage}%"
-    c.setFont("Helvetica-Bold", 16)
-    score_color = (
-        "#52c41a"
-        if session.score_percentage >= 70
-        else "#faad14" if session.score_percentage >= 50 else "#ff4d4f"
+    render_certificate(
+        pdf_filename,
+        full_name,
+        session.correct_answers,
+        session.total_questions,
+        session.score_percentage,
+        session.created_at,
     )
-    c.setFillColor(colors.HexColor(score_color))
-    c.drawCentredString(width / 2, height - 435, score_text)
-
-    # Date
-    c.setFont("Helvetica", 12)
-    c.setFillColor(colors.black)
-    date_str = session.created_at.strftime("%d.%m.%Y")
-    c.drawCentredString(width / 2, height - 500, f"Sana: {date_str}")
-
-    # Footer
-    c.setFont("Helvetica-Oblique", 10)
-    c.setFillColor(colors.HexColor("#666666"))
-    c.drawCentredString(width / 2, 80, "Online Ta'lim Platformasi")
-    c.drawCentredString(width / 2, 60, "www.online-lesson.uz")
-
-    # Logo placeholder (you can add actual logo if available)
-    c.setFont("Helvetica-Bold", 20)
-    c.setFillColor(colors.HexColor("#faad14"))
-    c.drawCentredString(width / 2, height - 80, "OXU")
-
-    # Save PDF
-    c.save()
 
     # Return the PDF file
     return FileResponse(
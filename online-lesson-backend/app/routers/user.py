@@ -1,18 +1,22 @@
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from .. import models, schemas, utils
-from fastapi import Depends, HTTPException, status, APIRouter
+from .. import models, schemas, utils, importers
+from fastapi import Depends, HTTPException, status, APIRouter, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 
 from ..database import get_db
+from ..oauth2 import get_current_admin_user
 
 router = APIRouter(prefix="/user", tags=["user"])
 
+# Rows validated, hashed and inserted together by the bulk import
+IMPORT_BATCH_SIZE = 1000
 
-@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    new_user = models.User(**user.dict())
-    new_user.role = "user"
+
+def _save_new_user(db: Session, new_user: models.User):
     db.add(new_user)
     try:
         db.commit()
@@ -32,6 +36,22 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
 
 
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
+async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    # DB work goes to the request threadpool, bcrypt to the password executor
+    new_user = models.User(**user.dict())
+    try:
+        new_user.password = await utils.hash_password_async(user.password)
+    except utils.PasswordQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server band, birozdan so‘ng qayta urinib ko‘ring",
+            headers={"Retry-After": "1"},
+        )
+    new_user.role = "user"
+    return await run_in_threadpool(_save_new_user, db, new_user)
+
+
 @router.get('/{id}', response_model=schemas.UserOut)
 def get_user(id: int, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.id == id).first()
@@ -40,3 +60,112 @@ def get_user(id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with id:{id} was not found")
     return user
+
+
+def _cell_text(value):
+    # XLSX cells keep their type: a numeric username arrives as an int
+    return None if value is None else str(value)
+
+
+def _validate_user_row(row: dict):
+    missing = [
+        field for field in schemas.UserCreate.model_fields if row.get(field) is None
+    ]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    try:
+        return schemas.UserCreate(
+            **{field: str(row[field]) for field in schemas.UserCreate.model_fields}
+        )
+    except ValidationError as e:
+        raise ValueError(
+            "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        )
+
+
+def _insert_users(db: Session, batch, report: dict):
+    """Insert validated (row_number, UserCreate) pairs; existing usernames fail."""
+    password_hashes = utils.hash_passwords_parallel([u.password for _, u in batch])
+    stmt = (
+        insert(models.User)
+        .values([
+            {**u.dict(), "password": password_hash, "role": "user"}
+            for (_, u), password_hash in zip(batch, password_hashes)
+        ])
+        .on_conflict_do_nothing(index_elements=["username"])
+        .returning(models.User.username)
+    )
+    created = set(db.scalars(stmt).all())
+    db.commit()
+
+    report["created"] += len(created)
+    for row_number, u in batch:
+        if u.username not in created:
+            report["errors"].append({
+                "row": row_number,
+                "username": u.username,
+                "error": "Username already exists",
+            })
+
+
+@router.post("/import", response_model=schemas.ImportReport)
+def import_users(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user),
+):
+    """
+    Bulk-create students from a CSV or XLSX file with the columns
+    firstname, lastname, username, password, faculty, direction.
+    Rows are processed in batches; valid rows are created even if others fail.
+    If the file turns out to be unreadable after some batches were committed,
+    the report says from which row on nothing was imported.
+    """
+    fmt = importers.file_format(file)
+    report = {"total_rows": 0, "created": 0, "failed": 0, "errors": []}
+    seen_usernames = set()
+    rows = importers.batched(importers.iter_rows(file, fmt), IMPORT_BATCH_SIZE)
+    row_number = 1
+
+    while True:
+        try:
+            chunk = next(rows, None)
+        except HTTPException as e:
+            if not report["total_rows"]:
+                raise
+            # Earlier batches are committed: report where reading stopped
+            report["errors"].append({
+                "row": row_number + 1,
+                "error": f"{e.detail}; this and later rows were not imported",
+            })
+            break
+        if chunk is None:
+            break
+        batch = []
+        for row_number, row in chunk:
+            report["total_rows"] += 1
+            try:
+                new_user = _validate_user_row(row)
+            except ValueError as e:
+                report["errors"].append({
+                    "row": row_number,
+                    "username": _cell_text(row.get("username")),
+                    "error": str(e),
+                })
+                continue
+            if new_user.username in seen_usernames:
+                report["errors"].append({
+                    "row": row_number,
+                    "username": new_user.username,
+                    "error": "Duplicate username in file",
+                })
+                continue
+            seen_usernames.add(new_user.username)
+            batch.append((row_number, new_user))
+
+        if batch:
+            _insert_users(db, batch, report)
+
+    report["errors"].sort(key=lambda e: e["row"])
+    report["failed"] = len(report["errors"])
+    return report
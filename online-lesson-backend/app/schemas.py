@@ -1,8 +1,8 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
 
 class UserCreate(BaseModel):
@@ -27,6 +27,35 @@ class UserOut(BaseModel):
         from_attributes = True
 
 
+class CurrentUser(BaseModel):
+    """Authenticated user as cached by oauth2.get_current_user."""
+
+    id: int
+    username: str
+    firstname: str
+    lastname: str
+    faculty: Optional[str] = None
+    direction: Optional[str] = None
+    role: str
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
+
+class ImportRowError(BaseModel):
+    row: int
+    username: Optional[str] = None
+    error: str
+
+
+class ImportReport(BaseModel):
+    total_rows: int
+    created: int
+    failed: int
+    errors: List[ImportRowError]
+
+
 class UserLogin(BaseModel):
     username: str
     password: str
@@ -64,6 +93,21 @@ class Test(TestBase):
         from_attributes = True
 
 
+class TestImportRow(BaseModel):
+    row: int
+    status: str  # "created" or "failed"
+    material_id: Optional[int] = None
+    test_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class TestImportReport(BaseModel):
+    total_rows: int
+    created: int
+    failed: int
+    rows: List[TestImportRow]
+
+
 # =========================
 # Attachment schemas
 # =========================
@@ -156,6 +200,67 @@ class MaterialProgressResponse(BaseModel):
     percentage: float
 
 
+class WatchEvent(BaseModel):
+    attachment_id: UUID
+    position: float  # current playback position, seconds
+    duration: float  # video length, seconds
+    watched: List[Tuple[float, float]] = []  # ranges played since the last event
+
+    @field_validator("watched")
+    @classmethod
+    def _check_ranges(cls, ranges):
+        for start, end in ranges:
+            if not 0 <= start <= end:
+                raise ValueError("each range must satisfy 0 <= start <= end")
+        return ranges
+
+
+class WatchEventBatch(BaseModel):
+    events: List[WatchEvent]
+
+
+class SectionProgressSummary(BaseModel):
+    section_id: int
+    name: str
+    total_items: int
+    completed_items: int
+    percentage: float
+
+
+class ProgressSummary(BaseModel):
+    user_id: int
+    total_items: int
+    completed_items: int
+    percentage: float
+    sections: List[SectionProgressSummary]
+
+
+class CohortSectionProgress(BaseModel):
+    section_id: int
+    name: str
+    total_items: int
+    average_completed_items: float
+    percentage: float
+
+
+class CohortStudentProgress(BaseModel):
+    user_id: int
+    username: str
+    firstname: str
+    lastname: str
+    faculty: Optional[str] = None
+    direction: Optional[str] = None
+    completed_items: int
+    percentage: float
+
+
+class CohortProgress(BaseModel):
+    total_students: int
+    total_items: int
+    sections: List[CohortSectionProgress]
+    students: List[CohortStudentProgress]
+
+
 # =========================
 # Test Session schemas
 # =========================
@@ -191,3 +296,70 @@ class TestSessionResult(BaseModel):
 class TestSessionHistory(BaseModel):
     sessions: List[TestSessionResult]
     total_sessions: int
+
+
+# =========================
+# Leaderboard schemas
+# =========================
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    firstname: str
+    lastname: str
+    faculty: Optional[str] = None
+    direction: Optional[str] = None
+    score_percentage: int
+    created_at: datetime
+
+
+class CohortStanding(BaseModel):
+    name: Optional[str] = None
+    rank: int
+    total: int
+    percentile: float
+
+
+class LeaderboardStanding(BaseModel):
+    user_id: int
+    score_percentage: int
+    all: CohortStanding
+    faculty: Optional[CohortStanding] = None
+    direction: Optional[CohortStanding] = None
+
+
+# =========================
+# Bootstrap (first paint) schemas
+# =========================
+class TestStatus(BaseModel):
+    has_taken_test: bool
+    total_available_tests: int
+    test_question_count: int
+    existing_session_id: Optional[str] = None
+
+
+class MaterialSummary(BaseModel):
+    id: int
+    section_id: int
+    title: Optional[str]
+    total_tests: int
+    total_attachments: int
+
+
+class HomeBootstrap(BaseModel):
+    user: UserOut
+    sections: List[Section]
+    progress: ProgressSummary
+    test_status: TestStatus
+
+
+class SectionBootstrap(BaseModel):
+    user: UserOut
+    section: Section
+    materials: List[MaterialSummary]
+    progress: List[MaterialProgressResponse]
+
+
+class MaterialBootstrap(BaseModel):
+    user: UserOut
+    material: Material
+    progress: MaterialProgressResponse
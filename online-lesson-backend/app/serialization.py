@@ -0,0 +1,37 @@
+"""
+JSON fast path for large list endpoints.
+
+Rows come straight from column queries and are encoded by orjson,
+skipping ORM object construction and per-object Pydantic validation. Only
+for trusted data from our own database whose shape already matches the
+endpoint's declared response_model (kept for the OpenAPI docs).
+"""
+import uuid
+
+import orjson
+from fastapi import Response
+
+# Fields of the response schemas, in their serialization order
+TEST_FIELDS = ("material_id", "question", "options", "correct_answer", "id")
+ATTACHMENT_FIELDS = ("path", "name", "type", "id", "material_id", "created_at")
+MATERIAL_FIELDS = ("title", "id", "section_id")
+
+
+def rows_to_dicts(fields, rows):
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def _default(obj):
+    # orjson handles uuid.UUID itself but not subclasses such as asyncpg's
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError
+
+
+def json_bytes(content) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+def raw_json_response(body: bytes) -> Response:
+    """Response for an already encoded JSON body."""
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,223 @@
+"""
+Slow-query log with route, role and call-site attribution.
+
+Postgres can log slow statements, but it can't say which endpoint or which
+line of Python sent them. SQLAlchemy cursor events on all engines time every
+statement. Any statement slower than SLOW_QUERY_THRESHOLD_MS is recorded
+here with:
+- the route template of the request (from app/instrumentation.py);
+- the role from its bearer token;
+- the first frame inside ``app/`` that led to it.
+
+Statements are grouped by fingerprint. The fingerprint is the SQL with
+literals and bind parameters replaced by ``?`` and IN lists collapsed, so
+``id IN (1, 2, 3)`` and ``id IN (4)`` count as the same query. Parameter
+values are never stored, only their types.
+
+The log is kept in memory per worker, bounded by SLOW_QUERY_MAX_FINGERPRINTS.
+When a new fingerprint arrives and the log is full, the entry with the least
+total time is dropped. Admins browse it under ``/admin/slow-queries``.
+"""
+import collections
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import instrumentation, metrics
+from .config import settings
+
+try:
+    import greenlet
+except ImportError:  # only needed to see past AsyncSession's greenlet hop
+    greenlet = None
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(APP_DIR)
+# Frames in these modules are plumbing, not the code that asked for the query
+_SKIP_FILES = {
+    os.path.join(APP_DIR, name)
+    for name in ("slow_queries.py", "instrumentation.py", "database.py")
+}
+
+slow_queries_total = metrics.Counter(
+    "db_slow_queries_total",
+    "SQL statements slower than SLOW_QUERY_THRESHOLD_MS by route",
+    labelnames=("route",),
+)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(
+    r"%\(\w+\)s|%s|\$\d+(?:::\w+(?:\[\])?)?|(?<!:):\w+|\?"
+)
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\(\?(?:, \?)*\))(?:\s*,\s*\1)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    """SQL with literals and parameters as ``?`` and IN lists collapsed."""
+    sql = _STRING.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _ROWS.sub(r"\1, ...", sql)
+    return _LIST.sub("(?, ...)", sql)
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def _type_name(value) -> str:
+    return "null" if value is None else type(value).__name__
+
+
+def redact(parameters, executemany=False):
+    """Parameter types only; values may hold passwords or personal data."""
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return {"rows": len(parameters), "first": redact(parameters[0])}
+    if isinstance(parameters, dict):
+        return {key: _type_name(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_type_name(value) for value in parameters]
+    return _type_name(parameters)
+
+
+def _app_frame(frame):
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename not in _SKIP_FILES:
+            return frame
+        frame = frame.f_back
+    return None
+
+
+def call_site():
+    """``app/routers/x.py:42 in handler`` for the code that ran the statement."""
+    frame = _app_frame(sys._getframe(1))
+    if frame is None and greenlet is not None:
+        # AsyncSession runs the sync core in a child greenlet; the awaiting
+        # coroutines are on the parent's stack
+        parent = greenlet.getcurrent().parent
+        if parent is not None:
+            frame = _app_frame(parent.gr_frame)
+    if frame is None:
+        return "<outside app>"
+    path = os.path.relpath(frame.f_code.co_filename, BACKEND_DIR)
+    return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+class SlowQueryLog:
+    def __init__(self, max_fingerprints: int, samples: int):
+        self.max_fingerprints = max_fingerprints
+        self.samples = samples
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement, parameters, executemany, seconds, route, role, site):
+        normalized = normalize(statement)
+        key = fingerprint(normalized)
+        ms = seconds * 1000
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    cheapest = min(
+                        self._entries, key=lambda k: self._entries[k]["total_ms"]
+                    )
+                    del self._entries[cheapest]
+                entry = self._entries[key] = {
+                    "fingerprint": key,
+                    "statement": normalized,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "first_seen": now,
+                    "last_seen": now,
+                    "routes": collections.Counter(),
+                    "roles": collections.Counter(),
+                    "call_sites": collections.Counter(),
+                    "samples": collections.deque(maxlen=self.samples),
+                }
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["last_seen"] = now
+            entry["routes"][route] += 1
+            entry["roles"][role or "anonymous"] += 1
+            entry["call_sites"][site] += 1
+            entry["samples"].append({
+                "at": now,
+                "ms": round(ms, 2),
+                "route": route,
+                "role": role,
+                "call_site": site,
+                "parameters": redact(parameters, executemany),
+            })
+
+    @staticmethod
+    def _public(entry):
+        return {
+            **entry,
+            "total_ms": round(entry["total_ms"], 2),
+            "max_ms": round(entry["max_ms"], 2),
+            "mean_ms": round(entry["total_ms"] / entry["count"], 2),
+            "routes": dict(entry["routes"].most_common()),
+            "roles": dict(entry["roles"].most_common()),
+            "call_sites": dict(entry["call_sites"].most_common()),
+            "samples": list(entry["samples"]),
+        }
+
+    def snapshot(self, sort: str = "total_ms", limit: int = 50):
+        """Entries ordered by ``sort`` (total_ms, max_ms or count), largest first."""
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: e[sort], reverse=True)
+            return [self._public(entry) for entry in entries[:limit]]
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            return self._public(entry) if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+log = SlowQueryLog(settings.SLOW_QUERY_MAX_FINGERPRINTS, settings.SLOW_QUERY_SAMPLES)
+_threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_slow_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if elapsed < _threshold:
+        return
+    stats = instrumentation.current_stats()
+    if stats is not None and stats.scope is not None:
+        route = instrumentation.route_name(stats.scope)
+        role = stats.role
+    else:
+        route, role = "<no request>", None
+    slow_queries_total.inc(route=route)
+    log.record(statement, parameters, executemany, elapsed, route, role, call_site())
+
+
+if _threshold > 0:
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
@@ -1,6 +1,39 @@
+import asyncio
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+from .config import settings
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    # Hashes below the configured cost are upgraded on the next login
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a dedicated pool hashes in parallel without
+# occupying the threads that serve requests. At most
+# PASSWORD_HASH_MAX_PENDING jobs may be queued or running at once.
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_password_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+# Bulk imports hash thousands of passwords at once on a process pool,
+# created on first use
+_hash_process_pool = None
+_hash_process_pool_lock = threading.Lock()
+
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+class PasswordQueueFull(Exception):
+    """The password executor already has PASSWORD_HASH_MAX_PENDING jobs."""
 
 
 def hash_password(password):
@@ -9,3 +42,70 @@ def hash_password(password):
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password, stored_password):
+    """
+    Check a password against the stored value, which may be a bcrypt hash or
+    a legacy plaintext password. Returns ``(valid, new_hash)``; ``new_hash``
+    is set when the stored value should be replaced (plaintext, outdated
+    scheme or cost).
+    """
+    if pwd_context.identify(stored_password, required=False) is None:
+        valid = hmac.compare_digest(
+            plain_password.encode("utf-8"), stored_password.encode("utf-8")
+        )
+        return valid, hash_password(plain_password) if valid else None
+    return pwd_context.verify_and_update(plain_password, stored_password)
+
+
+async def _run_in_password_executor(func, *args):
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordQueueFull()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _password_slots.release()
+
+
+async def hash_password_async(password):
+    return await _run_in_password_executor(hash_password, password)
+
+
+async def verify_and_update_async(plain_password, stored_password):
+    return await _run_in_password_executor(
+        verify_and_update, plain_password, stored_password
+    )
+
+
+def _hash_process_count():
+    return settings.PASSWORD_HASH_PROCESSES or os.cpu_count()
+
+
+def _get_hash_process_pool():
+    global _hash_process_pool
+    with _hash_process_pool_lock:
+        if _hash_process_pool is None:
+            _hash_process_pool = ProcessPoolExecutor(
+                max_workers=_hash_process_count(),
+                # spawn: forking a process with running threads is unsafe
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_process_pool
+
+
+def _hash_imported_password(password):
+    # Runs in a pool process. A cost below BCRYPT_ROUNDS is upgraded by
+    # verify_and_update on the student's first login.
+    rounds = settings.IMPORT_BCRYPT_ROUNDS or settings.BCRYPT_ROUNDS
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def hash_passwords_parallel(passwords):
+    """Hash many passwords on the process pool, preserving order."""
+    if not passwords:
+        return []
+    pool = _get_hash_process_pool()
+    chunksize = max(1, len(passwords) // (_hash_process_count() * 4))
+    return list(pool.map(_hash_imported_password, passwords, chunksize=chunksize))
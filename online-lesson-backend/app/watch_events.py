@@ -0,0 +1,272 @@
+"""
+Buffered ingestion of video watch heartbeats.
+
+Players post batches of watch events to ``/progress/events``. The events are
+merged in memory per (user, attachment) and a background thread writes the
+merged state to ``watch_progress`` every WATCH_FLUSH_INTERVAL_SECONDS, so the
+database sees a few bulk statements per interval however many viewers are
+sending heartbeats. A video whose watched share reaches
+WATCH_COMPLETION_RATIO is marked completed in ``user_progress``.
+
+Pending events live in the worker process; anything not yet flushed is lost
+if the process is killed (a clean shutdown flushes). When a flush statement
+fails, its entries are written one by one so a single bad entry (e.g. a
+user deleted meanwhile) cannot hold back the rest; an entry that still
+fails is retried on later flushes and dropped after WATCH_FLUSH_MAX_ATTEMPTS.
+"""
+import logging
+import threading
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from . import models, progress_rollup
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Keys per flush statement; keeps bind parameters well below Postgres' limit
+FLUSH_CHUNK_SIZE = 2000
+
+
+def merge_ranges(ranges, duration=None):
+    """Sort and merge overlapping [start, end] ranges, clamped to the video."""
+    cleaned = []
+    for start, end in ranges:
+        start = max(float(start), 0.0)
+        end = float(end)
+        if duration:
+            end = min(end, duration)
+        if end > start:
+            cleaned.append([start, end])
+    cleaned.sort()
+
+    merged = []
+    for start, end in cleaned:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def watched_seconds(ranges):
+    return sum(end - start for start, end in ranges)
+
+
+def _is_complete(seconds, duration):
+    return duration > 0 and seconds >= duration * settings.WATCH_COMPLETION_RATIO
+
+
+def _persist(db, pending):
+    """Merge pending entries into watch_progress and record new completions."""
+    keys = list(pending)
+    known_attachments = {
+        row.id
+        for row in db.query(models.Attachment.id).filter(
+            models.Attachment.id.in_({attachment_id for _, attachment_id in keys})
+        )
+    }
+    keys = [key for key in keys if key[1] in known_attachments]
+    if not keys:
+        return
+
+    stored = {
+        (row.user_id, row.attachment_id): row
+        for row in db.query(models.WatchProgress)
+        .filter(
+            tuple_(models.WatchProgress.user_id, models.WatchProgress.attachment_id).in_(
+                keys
+            )
+        )
+        .with_for_update()
+    }
+
+    rows = []
+    completed = []
+    for key in keys:
+        entry = pending[key]
+        previous = stored.get(key)
+        duration = entry["duration"]
+        ranges = entry["ranges"]
+        if previous is not None:
+            duration = max(duration, previous.duration)
+            ranges = ranges + previous.watched_ranges
+        ranges = merge_ranges(ranges, duration)
+        seconds = watched_seconds(ranges)
+
+        rows.append({
+            "user_id": key[0],
+            "attachment_id": key[1],
+            "position": entry["position"],
+            "duration": duration,
+            "watched_ranges": ranges,
+            "watched_seconds": seconds,
+        })
+        was_complete = previous is not None and _is_complete(
+            previous.watched_seconds, previous.duration
+        )
+        if _is_complete(seconds, duration) and not was_complete:
+            completed.append(key)
+
+    stmt = insert(models.WatchProgress).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "attachment_id"],
+        set_={
+            "position": stmt.excluded.position,
+            "duration": stmt.excluded.duration,
+            "watched_ranges": stmt.excluded.watched_ranges,
+            "watched_seconds": stmt.excluded.watched_seconds,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+    if completed:
+        _mark_completed(db, completed)
+
+
+def _mark_completed(db, keys):
+    completed_at = datetime.utcnow()
+    stmt = insert(models.UserProgress).values(
+        [
+            {
+                "id": uuid.uuid4(),
+                "user_id": user_id,
+                "attachment_id": attachment_id,
+                "is_completed": 1,
+                "completed_at": completed_at,
+            }
+            for user_id, attachment_id in keys
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "attachment_id"],
+        set_={"is_completed": 1, "completed_at": stmt.excluded.completed_at},
+        where=models.UserProgress.is_completed == 0,
+    ).returning(models.UserProgress.user_id, models.UserProgress.attachment_id)
+
+    by_user = {}
+    for user_id, attachment_id in db.execute(stmt):
+        by_user.setdefault(user_id, []).append(attachment_id)
+    for user_id, attachment_ids in by_user.items():
+        progress_rollup.record_completions(db, user_id, attachment_ids=attachment_ids)
+
+
+class WatchEventBuffer:
+    """In-memory, per-(user, attachment) merged watch state awaiting a flush."""
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def add(self, user_id: int, events) -> bool:
+        """Merge a batch of events; False if the buffer is full."""
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+                return False
+            for event in events:
+                self._merge(
+                    (user_id, event.attachment_id),
+                    event.position,
+                    event.duration,
+                    event.watched,
+                )
+        return True
+
+    def _merge(self, key, position, duration, ranges):
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = {
+                "position": 0.0, "duration": 0.0, "ranges": [], "attempts": 0
+            }
+        entry["position"] = position
+        entry["duration"] = max(entry["duration"], duration)
+        entry["ranges"] = merge_ranges(entry["ranges"] + list(ranges))
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        keys = list(pending)
+        for i in range(0, len(keys), FLUSH_CHUNK_SIZE):
+            chunk = {key: pending[key] for key in keys[i:i + FLUSH_CHUNK_SIZE]}
+            db = SessionLocal()
+            try:
+                _persist(db, chunk)
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to flush %d watch progress entries", len(chunk))
+                self._persist_each(db, chunk)
+            finally:
+                db.close()
+
+    def _persist_each(self, db, chunk):
+        """Write a failed chunk entry by entry, requeueing the ones that fail."""
+        failed = {}
+        for key, entry in chunk.items():
+            try:
+                with db.begin_nested():
+                    _persist(db, {key: entry})
+            except Exception:
+                failed[key] = entry
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to flush watch progress entries one by one")
+            failed = chunk
+        if failed:
+            self._requeue(failed)
+
+    def _requeue(self, chunk):
+        with self._lock:
+            for key, entry in chunk.items():
+                attempts = entry["attempts"] + 1
+                if attempts >= settings.WATCH_FLUSH_MAX_ATTEMPTS:
+                    logger.error(
+                        "Dropping watch progress of user %s, attachment %s after %d "
+                        "failed flushes", key[0], key[1], attempts,
+                    )
+                    continue
+                self._merge(key, entry["position"], entry["duration"], entry["ranges"])
+                pending = self._pending[key]
+                pending["attempts"] = max(pending["attempts"], attempts)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(settings.WATCH_FLUSH_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="watch-events-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+
+buffer = WatchEventBuffer(settings.WATCH_MAX_PENDING)
@@ -0,0 +1,280 @@
+"""
+Exam-day load test: many students registering and taking the final test.
+
+Every virtual student registers (POST /user/), logs in, checks the exam
+status, starts the exam, submits answers and downloads the certificate
+when they passed. Students arrive following a ramp-up profile:
+
+  spike    all students at once
+  linear   evenly spread over --ramp-seconds
+  steps    --steps equal waves spread over --ramp-seconds
+
+Per endpoint it reports p50/p95/p99 latency, throughput and errors, and
+with --output writes the same as JSON (plus the commit and settings) so
+runs can be compared across commits with --compare.
+
+Point it at a server backed by a local Postgres with a question bank
+(--seed-questions adds one through the API). Admission control limits
+requests per client IP, so for a single-machine run start the server
+with ADMISSION_CONTROL_ENABLED=false or raised ADMISSION_IP_* limits;
+429/503 answers are reported as "rejected".
+
+    python -m benchmarks.loadtest --students 500 --profile linear \\
+        --ramp-seconds 60 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)  # endpoint -> [(latency, status)]
+        self.started = None
+        self.finished = None
+
+    async def request(self, client, endpoint, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        self.samples[endpoint].append((time.perf_counter() - started, status))
+        return response
+
+    def summary(self):
+        elapsed = self.finished - self.started
+        result = {}
+        for endpoint, samples in self.samples.items():
+            latencies = sorted(latency for latency, _ in samples)
+            statuses = [status for _, status in samples]
+            result[endpoint] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2),
+                "errors": sum(
+                    1 for s in statuses if s == 0 or (s >= 400 and s not in (429, 503))
+                ),
+                "rejected": sum(1 for s in statuses if s in (429, 503)),
+            }
+        return result
+
+
+def _percentile(values, percent):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def _arrival_offsets(students, profile, ramp_seconds, steps):
+    if profile == "spike" or ramp_seconds <= 0:
+        return [0.0] * students
+    if profile == "linear":
+        return [i * ramp_seconds / students for i in range(students)]
+    wave = ramp_seconds / max(steps - 1, 1)
+    return [(i * steps // students) * wave for i in range(students)]
+
+
+async def _student(client, recorder, run_id, number, answer_key, accuracy):
+    username = f"load_{run_id}_{number}"
+    password = "parol123"
+    response = await recorder.request(
+        client, "POST /user/", "POST", "/user/",
+        json={
+            "firstname": "Talaba",
+            "lastname": str(number),
+            "username": username,
+            "password": password,
+            "faculty": f"Fakultet {number % 5}",
+            "direction": f"Yo'nalish {number % 12}",
+        },
+    )
+    if response is None or response.status_code != 201:
+        return
+
+    response = await recorder.request(
+        client, "POST /auth/login", "POST", "/auth/login",
+        json={"username": username, "password": password},
+    )
+    if response is None or response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    await recorder.request(
+        client, "GET /test-sessions/check/status", "GET",
+        "/test-sessions/check/status", headers=headers,
+    )
+    response = await recorder.request(
+        client, "POST /test-sessions/start", "POST", "/test-sessions/start",
+        json={}, headers=headers,
+    )
+    if response is None or response.status_code != 200:
+        return
+    exam = response.json()
+
+    answers = {}
+    for question in exam["questions"]:
+        correct = answer_key.get(question["id"])
+        if correct is not None and random.random() < accuracy:
+            answers[str(question["id"])] = correct
+        else:
+            answers[str(question["id"])] = random.choice(question["options"])
+    response = await recorder.request(
+        client, "POST /test-sessions/submit", "POST", "/test-sessions/submit",
+        json={
+            "session_id": exam["session_id"],
+            "answers": answers,
+            "question_ids": [q["id"] for q in exam["questions"]],
+        },
+        headers=headers,
+    )
+    if response is None or response.status_code != 200 or not response.json()["passed"]:
+        return
+
+    await recorder.request(
+        client, "GET /test-sessions/certificate/{session_id}", "GET",
+        f"/test-sessions/certificate/{exam['session_id']}", headers=headers,
+    )
+
+
+async def _seed_questions(client, args):
+    """Make sure the bank holds at least --seed-questions tests."""
+    existing = (await client.get("/tests/")).json()
+    missing = args.seed_questions - len(existing)
+    if missing <= 0:
+        return
+    response = await client.post(
+        "/auth/login",
+        json={"username": args.admin_username, "password": args.admin_password},
+    )
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    sections = (await client.get("/sections/")).json()
+    response = await client.post(
+        "/materials/",
+        data={"section_id": sections[-1]["id"], "title": f"Yuklama testi {uuid.uuid4().hex[:8]}"},
+        headers=headers,
+    )
+    response.raise_for_status()
+    material_id = response.json()["id"]
+    for i in range(missing):
+        options = [f"Variant {k}" for k in "ABCD"]
+        response = await client.post(
+            "/tests/",
+            json={
+                "material_id": material_id,
+                "question": f"Yuklama savoli {i}?",
+                "options": options,
+                "correct_answer": random.choice(options),
+            },
+            headers=headers,
+        )
+        response.raise_for_status()
+    print(f"Seeded {missing} questions")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_table(endpoints, baseline=None):
+    print(f"{'endpoint':<44} {'reqs':>6} {'req/s':>8} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'err':>5} {'rej':>5}")
+    for endpoint, row in endpoints.items():
+        line = (f"{endpoint:<44} {row['requests']:>6} {row['throughput_rps']:>8.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+                f"{row['errors']:>5} {row['rejected']:>5}")
+        before = (baseline or {}).get(endpoint)
+        if before and before["p95_ms"]:
+            change = (row["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+            line += f"   p95 {change:+.0f}% vs baseline"
+        print(line)
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=args.connections)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        if args.seed_questions:
+            await _seed_questions(client, args)
+        # The public test listing doubles as the answer key for the simulation
+        answer_key = {t["id"]: t["correct_answer"] for t in (await client.get("/tests/")).json()}
+
+        recorder = Recorder()
+        run_id = uuid.uuid4().hex[:8]
+        offsets = _arrival_offsets(args.students, args.profile, args.ramp_seconds, args.steps)
+
+        async def arrive(number, offset):
+            await asyncio.sleep(offset)
+            await _student(client, recorder, run_id, number, answer_key, args.accuracy)
+
+        recorder.started = time.perf_counter()
+        await asyncio.gather(*(arrive(i, o) for i, o in enumerate(offsets)))
+        recorder.finished = time.perf_counter()
+
+    endpoints = recorder.summary()
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+    _print_table(endpoints, baseline)
+    print(f"{args.students} students in {recorder.finished - recorder.started:.1f} s")
+
+    if args.output:
+        result = {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "config": {
+                key: getattr(args, key)
+                for key in ("base_url", "students", "profile", "ramp_seconds",
+                            "steps", "accuracy", "connections")
+            },
+            "duration_seconds": round(recorder.finished - recorder.started, 3),
+            "endpoints": endpoints,
+        }
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--profile", choices=("spike", "linear", "steps"), default="linear")
+    parser.add_argument("--ramp-seconds", type=float, default=30.0)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--accuracy", type=float, default=0.8,
+                        help="share of questions a student answers correctly")
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed-questions", type=int, default=0,
+                        help="add tests through the API until the bank has this many")
+    parser.add_argument("--admin-username", default="admin")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
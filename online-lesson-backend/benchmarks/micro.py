@@ -0,0 +1,202 @@
+"""
+Microbenchmarks of CPU-bound hot functions, checked against stored baselines.
+
+Cases:
+  exam.sample_questions       30 of 500 questions, options shuffled (/start)
+  exam.grade_exam             30 answered questions (/test-sessions/submit)
+  exam.grade_material_tests   20 tests of one material (/progress/submit-test)
+  certificate.render          certificate PDF into memory
+  jwt.encode / jwt.decode     oauth2.create_access_token and the decode behind
+                              verify_access_token (its cache bypassed)
+  schemas.Material list       100 materials with tests and attachments,
+                              response_model validation + JSON
+
+Each case is timed in --repeat rounds of enough calls to take ~0.1 s. The
+fastest round's time per call (the least disturbed by other processes; the
+median is shown too) is compared with benchmarks/baselines/micro.json, and
+the run exits with status 1 when any case is more than --threshold slower.
+Baselines depend on the machine: record them with --save on the machine
+that runs the check (e.g. the CI runner) and commit the file.
+
+    python -m benchmarks.micro                 # compare with the baseline
+    python -m benchmarks.micro --save          # record a new baseline
+    python -m benchmarks.micro -k grade --threshold 0.5
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app import exam, oauth2, schemas
+from app.certificate import render_certificate
+from app.question_bank import Question
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+
+def _bank(count):
+    return [
+        Question(
+            id=i,
+            material_id=i % 40 + 1,
+            question=f"Savol {i}: qaysi javob to'g'ri?",
+            options=(f"A javob {i}", f"B javob {i}", f"C javob {i}", f"D javob {i}"),
+            correct_answer=f"A javob {i}",
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def _answers(questions, rng):
+    return {str(q.id): rng.choice(q.options) for q in questions}
+
+
+def _materials(count):
+    now = datetime.now(timezone.utc)
+    materials = []
+    for m_id in range(1, count + 1):
+        materials.append(SimpleNamespace(
+            id=m_id,
+            section_id=1,
+            title=f"Mavzu {m_id}",
+            tests=[
+                SimpleNamespace(id=q.id, material_id=m_id, question=q.question,
+                                options=list(q.options), correct_answer=q.correct_answer)
+                for q in _bank(10)
+            ],
+            attachments=[
+                SimpleNamespace(id=uuid.uuid4(), material_id=m_id, created_at=now,
+                                path=f"uploads/{uuid.uuid4()}.pdf", name="maruza.pdf",
+                                type="file"),
+            ],
+        ))
+    return materials
+
+
+def cases():
+    """name -> zero-argument callable."""
+    rng = random.Random(42)
+    bank = _bank(500)
+    exam_questions = bank[:30]
+    exam_answers = _answers(exam_questions, rng)
+    material_tests = bank[:20]
+    material_answers = _answers(material_tests, rng)
+    token = oauth2.create_access_token({"user_id": str(uuid.uuid4()), "role": "user"})
+    materials = _materials(100)
+    adapter = TypeAdapter(List[schemas.Material])
+    created_at = datetime.now(timezone.utc)
+    jwt = oauth2.jwt
+
+    return {
+        "exam.sample_questions": lambda: exam.sample_questions(bank, rng=rng),
+        "exam.grade_exam": lambda: exam.grade_exam(exam_questions, exam_answers),
+        "exam.grade_material_tests": lambda: exam.grade_material_tests(
+            material_tests, material_answers
+        ),
+        "certificate.render": lambda: render_certificate(
+            io.BytesIO(), "Talaba Talabayev", 27, 30, 90, created_at
+        ),
+        "jwt.encode": lambda: oauth2.create_access_token(
+            {"user_id": "42", "role": "user"}
+        ),
+        "jwt.decode": lambda: jwt.decode(
+            token, oauth2.SECRET_KEY, algorithms=[oauth2.ALGORITHM]
+        ),
+        "schemas.Material list": lambda: adapter.dump_json(
+            adapter.validate_python(materials, from_attributes=True)
+        ),
+    }
+
+
+def measure(func, repeat, round_seconds=0.1):
+    """Median and minimum seconds per call over ``repeat`` rounds."""
+    func()  # warm up (lazy imports, caches)
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= round_seconds / 10:
+            break
+        number *= 10
+    number = max(1, int(number * round_seconds / elapsed))
+
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - started) / number)
+    return statistics.median(rounds), min(rounds)
+
+
+def _machine():
+    return f"{platform.system()} {platform.machine()} Python {platform.python_version()}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-k", dest="pattern", help="only cases containing this text")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true",
+                        help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        baseline = stored["cases"]
+        if stored.get("machine") != _machine():
+            print(f"Note: baseline recorded on {stored.get('machine')}")
+
+    results = {}
+    regressions = []
+    print(f"{'case':<28} {'min us':>10} {'median us':>11} {'baseline':>10} {'change':>8}")
+    for name, func in cases().items():
+        if args.pattern and args.pattern not in name:
+            continue
+        median, best = measure(func, args.repeat)
+        results[name] = {"median_us": round(median * 1e6, 3), "min_us": round(best * 1e6, 3)}
+        line = f"{name:<28} {best * 1e6:>10.1f} {median * 1e6:>11.1f}"
+        before = baseline.get(name)
+        if before:
+            change = best * 1e6 / before["min_us"] - 1
+            line += f" {before['min_us']:>10.1f} {change:>+7.0%}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        if args.pattern and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                results = {**json.load(f)["cases"], **results}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": _machine(), "cases": results}, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} case(s) more than {args.threshold:.0%} slower "
+              f"than the baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Login throughput of the bcrypt pipeline at different cost factors.
+
+Measures password verifications per second on one thread and on a pool of
+``--workers`` threads (bcrypt releases the GIL, as in app.utils), and
+reports logins per second per core.
+
+    python -m benchmarks.password_hashing --rounds 10 11 12 13 --workers 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+
+def _verifications_per_second(context, password_hash, workers, seconds):
+    def verify(_):
+        return context.verify("correct horse battery staple", password_hash)
+
+    done = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while time.perf_counter() - started < seconds:
+            done += sum(pool.map(verify, range(workers)))
+    return done / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    cores = min(args.workers, os.cpu_count())
+    print(f"{'rounds':>6} {'ms/verify':>10} {'1 thread/s':>11} "
+          f"{f'{args.workers} threads/s':>13} {'per core/s':>11}")
+    for rounds in args.rounds:
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        password_hash = context.hash("correct horse battery staple")
+
+        single = _verifications_per_second(context, password_hash, 1, args.seconds)
+        pooled = _verifications_per_second(
+            context, password_hash, args.workers, args.seconds
+        )
+        print(f"{rounds:>6} {1000 / single:>10.1f} {single:>11.1f} "
+              f"{pooled:>13.1f} {pooled / cores:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
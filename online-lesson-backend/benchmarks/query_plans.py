@@ -0,0 +1,277 @@
+"""
+Query-plan check: no sequential scans of large tables on hot paths.
+
+Runs the student and admin request flows in-process against DATABASE_URL
+and captures every SQL statement they issue. Each statement is EXPLAINed
+on a separate connection. asyncpg's ``$n`` statements go through PREPARE /
+EXPLAIN EXECUTE. The check fails (exit status 1) when a plan scans a table
+with more than --max-rows rows sequentially, unless the scan is listed in
+ALLOWED_SEQ_SCANS, or in SEQ_SCAN_MIN_SHARE and the plan expects it to
+return at least that share of the table (where no index would help).
+
+Plans depend on data volume, so run it on a database filled by the
+generator, at least a few hundred thousand user_progress rows:
+
+    DATABASE_URL=postgresql://.../plans python -m app.cli init-db
+    DATABASE_URL=postgresql://.../plans python -m app.cli datagen --users 20000
+    DATABASE_URL=postgresql://.../plans python -m benchmarks.query_plans
+
+Generated students log in with the generator's password (app.datagen).
+"""
+import argparse
+import json
+import sys
+
+import psycopg2
+import psycopg2.extras
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
+
+from app import datagen
+from app.config import settings
+from app.database import SessionLocal
+from app.main import app
+
+# Endpoints that read a whole table on purpose: (scenario, table)
+ALLOWED_SEQ_SCANS = {
+    ("GET /tests/", "tests"),  # public listing of every test
+    ("POST /test-sessions/start", "tests"),  # question bank load, cached
+    # Admin-only cohort aggregates read a faculty's share of the whole rollup
+    ("GET /admin/progress/cohort", "section_progress"),
+}
+
+# Endpoints whose scans read a data-dependent share of a table:
+# (scenario, table) -> least share of the table's rows that justifies a seq
+# scan. Generated sections hold about a fifth of all tests and attachments
+# each; a smaller section must be served by the material_id indexes.
+SEQ_SCAN_MIN_SHARE = {
+    ("GET /materials/sectionId/{section_id}", "tests"): 0.1,
+    ("GET /materials/sectionId/{section_id}", "attachments"): 0.1,
+}
+
+EXPLAINED_PREFIXES = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+def _dsn():
+    url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+class Capture:
+    """Statements issued through any SQLAlchemy engine while enabled."""
+
+    def __init__(self):
+        self.statements = []
+        event.listen(Engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany and parameters:
+            parameters = parameters[0]
+        driver = conn.dialect.driver
+        self.statements.append((statement, parameters, driver))
+
+    def take(self):
+        statements, self.statements = self.statements, []
+        return statements
+
+
+class Explainer:
+    def __init__(self, dsn):
+        self.conn = psycopg2.connect(dsn)
+        self.conn.autocommit = True
+        psycopg2.extras.register_uuid()
+        self._sizes = {}
+
+    def plan(self, statement, parameters, driver):
+        with self.conn.cursor() as cursor:
+            if driver == "asyncpg":
+                cursor.execute(f"PREPARE plan_check AS {statement}")
+                try:
+                    placeholders = ", ".join(["%s"] * len(parameters or ()))
+                    cursor.execute(
+                        f"EXPLAIN (FORMAT JSON) EXECUTE plan_check ({placeholders})"
+                        if placeholders else "EXPLAIN (FORMAT JSON) EXECUTE plan_check",
+                        tuple(parameters or ()),
+                    )
+                    return cursor.fetchone()[0][0]["Plan"]
+                finally:
+                    cursor.execute("DEALLOCATE plan_check")
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters or None)
+            return cursor.fetchone()[0][0]["Plan"]
+
+    def table_rows(self, table):
+        if table not in self._sizes:
+            with self.conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    (table,),
+                )
+                self._sizes[table] = cursor.fetchone()[0]
+        return self._sizes[table]
+
+
+def seq_scans(plan):
+    """(relation name, estimated rows returned) of every sequential scan node."""
+    if plan["Node Type"] in ("Seq Scan", "Parallel Seq Scan"):
+        yield plan["Relation Name"], plan["Plan Rows"]
+    for child in plan.get("Plans", ()):
+        yield from seq_scans(child)
+
+
+def _fixtures(admin_username):
+    """Ids to request: a student without an exam, content with tests."""
+    db = SessionLocal()
+    try:
+        row = lambda sql: db.execute(text(sql)).first()  # noqa: E731
+        student = row(
+            "SELECT u.id, u.username FROM users u WHERE u.role = 'user' "
+            "AND u.username LIKE 'student%' AND NOT EXISTS "
+            "(SELECT 1 FROM test_sessions s WHERE s.user_id = u.id) "
+            "ORDER BY u.id LIMIT 1"
+        )
+        material = row(
+            "SELECT m.id, m.section_id FROM materials m "
+            "WHERE EXISTS (SELECT 1 FROM tests t WHERE t.material_id = m.id) "
+            "AND EXISTS (SELECT 1 FROM attachments a WHERE a.material_id = m.id) "
+            "ORDER BY m.id DESC LIMIT 1"
+        )
+        if student is None or material is None:
+            sys.exit("Fill the database first: python -m app.cli datagen")
+        test_id = row(f"SELECT id FROM tests WHERE material_id = {material.id} LIMIT 1").id
+        attachment_id = row(
+            f"SELECT id FROM attachments WHERE material_id = {material.id} LIMIT 1"
+        ).id
+        session_id = row("SELECT id FROM test_sessions LIMIT 1").id
+        other_user = row(
+            "SELECT user_id FROM test_sessions ORDER BY score_percentage DESC LIMIT 1"
+        ).user_id
+        # The smallest faculty: its filters are selective, so an index must be usable
+        faculty = row(
+            "SELECT faculty FROM users WHERE role = 'user' "
+            "GROUP BY faculty ORDER BY count(*), faculty LIMIT 1"
+        ).faculty
+    finally:
+        db.close()
+    return {
+        "student": student,
+        "admin_username": admin_username,
+        "material_id": material.id,
+        "section_id": material.section_id,
+        "test_id": test_id,
+        "attachment_id": str(attachment_id),
+        "session_id": str(session_id),
+        "other_user": other_user,
+        "faculty": faculty,
+    }
+
+
+def scenarios(f):
+    """(name, role, method, url, json body); run in order, one student."""
+    exam = {}
+
+    def submit_body():
+        return {
+            "session_id": exam["session_id"],
+            "answers": {str(q["id"]): q["options"][0] for q in exam["questions"]},
+            "question_ids": [q["id"] for q in exam["questions"]],
+        }
+
+    return exam, [
+        ("GET /auth/me", "user", "GET", "/auth/me", None),
+        ("GET /sections/", "user", "GET", "/sections/", None),
+        ("GET /materials/sectionId/{section_id}", "user", "GET",
+         f"/materials/sectionId/{f['section_id']}", None),
+        ("GET /materials/{material_id}", "user", "GET", f"/materials/{f['material_id']}", None),
+        ("GET /tests/", "user", "GET", "/tests/", None),
+        ("GET /tests/material/{material_id}", "user", "GET",
+         f"/tests/material/{f['material_id']}", None),
+        ("POST /progress/complete", "user", "POST", "/progress/complete",
+         {"user_id": f["student"].id, "attachment_id": f["attachment_id"]}),
+        ("POST /progress/submit-test", "user", "POST", "/progress/submit-test",
+         {"material_id": f["material_id"], "answers": {str(f["test_id"]): "?"}}),
+        ("GET /progress/summary", "user", "GET", "/progress/summary", None),
+        ("GET /progress/material/{material_id}", "user", "GET",
+         f"/progress/material/{f['material_id']}", None),
+        ("GET /test-sessions/check/status", "user", "GET", "/test-sessions/check/status", None),
+        ("POST /test-sessions/start", "user", "POST", "/test-sessions/start", {}),
+        ("POST /test-sessions/submit", "user", "POST", "/test-sessions/submit", submit_body),
+        ("GET /test-sessions/history", "user", "GET", "/test-sessions/history", None),
+        ("GET /leaderboard/top", "user", "GET", f"/leaderboard/top?faculty={f['faculty']}", None),
+        ("GET /leaderboard/me", "user", "GET", "/leaderboard/me", None),
+        ("GET /leaderboard/user/{user_id}", "admin", "GET",
+         f"/leaderboard/user/{f['other_user']}", None),
+        ("GET /admin/progress/cohort", "admin", "GET",
+         f"/admin/progress/cohort?faculty={f['faculty']}", None),
+    ]
+
+
+def _login(client, username, password):
+    response = client.post("/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-rows", type=int, default=10_000,
+                        help="largest table a hot path may scan sequentially")
+    parser.add_argument("--admin-username", default="admin")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--verbose", action="store_true", help="print every statement")
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+
+    fixtures = _fixtures(args.admin_username)
+    explainer = Explainer(_dsn())
+    capture = Capture()
+    failures = []
+
+    with TestClient(app) as client:
+        headers = {
+            "user": _login(client, fixtures["student"].username, datagen.PASSWORD),
+            "admin": _login(client, args.admin_username, args.admin_password),
+        }
+        exam, steps = scenarios(fixtures)
+        print(f"{'scenario':<42} {'status':>6} {'queries':>8} {'seq scans':>10}")
+        for name, role, method, url, body in steps:
+            capture.take()
+            response = client.request(
+                method, url, headers=headers[role], json=body() if callable(body) else body
+            )
+            if name == "POST /test-sessions/start" and response.status_code == 200:
+                exam.update(response.json())
+            statements = [
+                s for s in capture.take()
+                if s[0].lstrip().upper().startswith(EXPLAINED_PREFIXES)
+            ]
+            scans = []
+            for statement, parameters, driver in statements:
+                plan = explainer.plan(statement, parameters, driver)
+                for table, returned in seq_scans(plan):
+                    rows = explainer.table_rows(table)
+                    min_share = SEQ_SCAN_MIN_SHARE.get((name, table))
+                    allowed = (name, table) in ALLOWED_SEQ_SCANS or (
+                        min_share is not None and returned >= min_share * rows
+                    )
+                    scans.append(table)
+                    if rows > args.max_rows and not allowed:
+                        failures.append((name, table, rows, statement, plan))
+                if args.verbose:
+                    print("   ", " ".join(statement.split())[:150])
+            print(f"{name:<42} {response.status_code:>6} {len(statements):>8} "
+                  f"{', '.join(sorted(set(scans))) or '-':>10}")
+
+    if failures:
+        print(f"\n{len(failures)} sequential scan(s) over tables larger than "
+              f"{args.max_rows} rows:")
+        for name, table, rows, statement, plan in failures:
+            print(f"\n{name}: Seq Scan on {table} (~{rows} rows)")
+            print("   ", " ".join(statement.split()))
+            print("   ", json.dumps(plan)[:500])
+        sys.exit(1)
+    print("\nNo sequential scans over large tables")
+
+
+if __name__ == "__main__":
+    main()
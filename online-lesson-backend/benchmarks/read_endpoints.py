@@ -0,0 +1,101 @@
+"""
+Requests per second of the hot read endpoints at high concurrency.
+
+Runs a closed loop of ``--concurrency`` clients against a running server
+for ``--seconds`` per endpoint and prints throughput and latency. Run it
+against a build before and after a change (same server flags, e.g.
+``uvicorn app.main:app --workers 1``) to compare.
+
+    python -m benchmarks.read_endpoints --base-url http://127.0.0.1:8000 \\
+        --username admin --password admin123 --concurrency 50 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _login(client, username, password):
+    response = await client.post(
+        "/auth/login", json={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _discover(client):
+    """Pick a section and a material that exist in the target database."""
+    sections = (await client.get("/sections/")).json()
+    section_id = next((s["id"] for s in sections if s["materials"]), sections[0]["id"])
+    materials = (await client.get(f"/materials/sectionId/{section_id}")).json()
+    paths = [
+        "/sections/",
+        f"/sections/{section_id}",
+        f"/materials/sectionId/{section_id}",
+        "/test-sessions/check/status",
+        "/progress/summary",
+    ]
+    if materials:
+        paths.append(f"/materials/{materials[0]['id']}")
+        paths.append(f"/progress/material/{materials[0]['id']}")
+    return paths
+
+
+async def _run(client, path, headers, concurrency, seconds):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=60
+    ) as client:
+        headers = await _login(client, args.username, args.password)
+        paths = args.paths or await _discover(client)
+        print(f"{'endpoint':<36} {'clients':>7} {'req/s':>9} "
+              f"{'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for path in paths:
+            for concurrency in args.concurrency:
+                result = await _run(client, path, headers, concurrency, args.seconds)
+                print(f"{path:<36} {concurrency:>7} {result['rps']:>9.1f} "
+                      f"{result['p50']:>8.1f} {result['p99']:>8.1f} "
+                      f"{result['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--paths", nargs="*", help="default: discovered read endpoints")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Serialization cost of the largest list endpoints, without the database.
+
+Compares, for synthetic ``GET /tests/`` and ``GET /materials/sectionId``
+payloads:
+  model+json    response_model validation of ORM-like objects, stdlib json
+                (FastAPI's default JSONResponse path)
+  model+orjson  the same validation, encoded by orjson (ORJSONResponse)
+  rows+orjson   row tuples straight to bytes (app.serialization fast path)
+
+    python -m benchmarks.serialization --tests 5000 --materials 200
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+from app import schemas, serialization
+
+
+def _tests(count, material_id=1, start=1):
+    return [
+        (material_id, f"Savol {i}?", ["A javob", "B javob", "C javob", "D javob"],
+         "A javob", i)
+        for i in range(start, start + count)
+    ]
+
+
+def _attachments(material_id):
+    now = datetime.now(timezone.utc)
+    return [
+        (f"uploads/{uuid.uuid4()}.pdf", "maruza.pdf", "file", uuid.uuid4(),
+         material_id, now),
+        ("https://youtu.be/xyz", "video", "link", uuid.uuid4(), material_id, now),
+    ]
+
+
+def _as_objects(fields, rows):
+    return [SimpleNamespace(**dict(zip(fields, row))) for row in rows]
+
+
+def _tests_payload(count):
+    rows = _tests(count)
+    objects = _as_objects(serialization.TEST_FIELDS, rows)
+    return List[schemas.Test], objects, lambda: serialization.json_bytes(
+        serialization.rows_to_dicts(serialization.TEST_FIELDS, rows)
+    )
+
+
+def _materials_payload(count, tests_per_material=10):
+    material_rows = [(f"Mavzu {i}", i, 1) for i in range(1, count + 1)]
+    test_rows = {
+        m_id: _tests(tests_per_material, m_id, m_id * tests_per_material)
+        for _, m_id, _ in material_rows
+    }
+    attachment_rows = {m_id: _attachments(m_id) for _, m_id, _ in material_rows}
+
+    objects = []
+    for row in material_rows:
+        material = _as_objects(serialization.MATERIAL_FIELDS, [row])[0]
+        material.tests = _as_objects(serialization.TEST_FIELDS, test_rows[material.id])
+        material.attachments = _as_objects(
+            serialization.ATTACHMENT_FIELDS, attachment_rows[material.id]
+        )
+        objects.append(material)
+
+    def fast():
+        materials = serialization.rows_to_dicts(
+            serialization.MATERIAL_FIELDS, material_rows
+        )
+        for material in materials:
+            material["tests"] = serialization.rows_to_dicts(
+                serialization.TEST_FIELDS, test_rows[material["id"]]
+            )
+            material["attachments"] = serialization.rows_to_dicts(
+                serialization.ATTACHMENT_FIELDS, attachment_rows[material["id"]]
+            )
+        return serialization.json_bytes(materials)
+
+    return List[schemas.Material], objects, fast
+
+
+def _timeit(func, seconds):
+    runs = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        body = func()
+        runs += 1
+    return (time.perf_counter() - started) / runs * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tests", type=int, default=5000)
+    parser.add_argument("--materials", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{'payload':<22} {'path':<13} {'ms/response':>12} {'bytes':>10}")
+    for name, (annotation, objects, fast) in (
+        (f"/tests/ x{args.tests}", _tests_payload(args.tests)),
+        (f"/materials x{args.materials}", _materials_payload(args.materials)),
+    ):
+        adapter = TypeAdapter(annotation)
+
+        def validated():
+            value = adapter.validate_python(objects, from_attributes=True)
+            return adapter.dump_python(value, mode="json")
+
+        paths = (
+            ("model+json", lambda: json.dumps(validated()).encode()),
+            ("model+orjson", lambda: orjson.dumps(validated())),
+            ("rows+orjson", fast),
+        )
+        for path, func in paths:
+            ms, size = _timeit(func, args.seconds)
+            print(f"{name:<22} {path:<13} {ms:>12.2f} {size:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Worker cold-start time: importing the app and time until it serves requests.
+
+Each run starts a fresh interpreter, so module caches are cold except for
+the OS page cache. Run from the backend directory with the usual env vars.
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def _import_seconds():
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app.main"], check=True)
+    return time.perf_counter() - started
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _ready_seconds(timeout=30.0):
+    """Seconds from spawning uvicorn until GET / answers 200."""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--port", str(port), "--log-level", "warning"],
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("server did not become ready")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    for name, measure in (("import app.main", _import_seconds),
+                          ("ready to serve", _ready_seconds)):
+        samples = [measure() for _ in range(args.runs)]
+        print(f"{name:<16} median {statistics.median(samples) * 1000:7.0f} ms  "
+              f"min {min(samples) * 1000:7.0f} ms  max {max(samples) * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Multi-process serving: gunicorn master with uvicorn workers.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+The app is imported once in the master (preload) and workers are forked
+from it, so they share its memory pages and start instantly. In-process
+caches stay coherent between workers through app/invalidation.py. Size
+WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below the database's
+max_connections.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with the workers
+    from app import database
+
+    async_engines = (database.async_engine, database.async_read_engine)
+    for engine in (database.engine, database.read_engine) + tuple(
+        e.sync_engine for e in async_engines if e is not None
+    ):
+        if engine is not None:
+            engine.dispose(close=False)
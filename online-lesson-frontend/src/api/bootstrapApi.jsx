@@ -0,0 +1,19 @@
+import axiosClient from "./axiosClient";
+
+// Bosh sahifa uchun hammasi bitta so'rovda: user, sections, progress, test holati
+export const getHomeBootstrap = async () => {
+  const res = await axiosClient.get("/bootstrap/home");
+  return res.data;
+};
+
+// Bo'lim sahifasi: materiallar va har bir materialning progressi
+export const getSectionBootstrap = async (sectionId) => {
+  const res = await axiosClient.get(`/bootstrap/section/${sectionId}`);
+  return res.data;
+};
+
+// Material sahifasi: material (testlar, fayllar) va uning progressi
+export const getMaterialBootstrap = async (materialId) => {
+  const res = await axiosClient.get(`/bootstrap/material/${materialId}`);
+  return res.data;
+};
@@ -15,3 +15,14 @@ export const submitTest = async (materialId, answers) => {
   return res.data;
 };
 
+
+// Bulk import of questions from a CSV, XLSX or JSON file (admin)
+export const importTests = async (file, materialId) => {
+  const formData = new FormData();
+  formData.append("file", file);
+  if (materialId) formData.append("material_id", materialId);
+  const res = await axiosClient.post("/tests/import", formData, {
+    timeout: 60000
+  });
+  return res.data;
+};
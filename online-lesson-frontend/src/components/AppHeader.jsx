@@ -1,4 +1,4 @@
-import React, { useEffect } from "react";
+import React from "react";
 import {
   Layout,
   Avatar,
@@ -26,11 +26,10 @@ const { Text } = Typography;
 const AppHeader = () => {
   const { data: user, isLoading } = useQuery({
     queryKey: ["user"],
-    queryFn: () => userApi.me()
+    queryFn: () => userApi.me(),
+    // Sahifalarning bootstrap so'rovlari keshni to'ldiradi
+    staleTime: 5 * 60 * 1000
   });
-  useEffect(() => {
-    userApi.me();
-  }, []);
   const navigate = useNavigate();
   const logout = () => {
     localStorage.removeItem("access_token");
@@ -1,5 +1,5 @@
-import { useQuery } from "@tanstack/react-query";
-import { getSections } from "../api/sectionsApi";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
+import { getHomeBootstrap } from "../api/bootstrapApi";
 import { Card, Row, Col, Typography, Tag, Spin } from "antd";
 import { Link, useNavigate } from "react-router-dom";
 import AppHeader from "../components/AppHeader";
@@ -8,11 +8,20 @@ const { Title } = Typography;
 
 export default function HomePage() {
   const navigate = useNavigate();
-  
-  // React Query bilan sectionsni olish
+  const queryClient = useQueryClient();
+
+  // Sahifa uchun hamma ma'lumot bitta so'rovda; header va test sahifasi
+  // keshdan o'qiydi
   const { data: sections = [], isLoading } = useQuery({
-    queryKey: ["sections"],
-    queryFn: getSections
+    queryKey: ["bootstrap", "home"],
+    queryFn: async () => {
+      const result = await getHomeBootstrap();
+      queryClient.setQueryData(["user"], result.user);
+      queryClient.setQueryData(["sections"], result.sections);
+      queryClient.setQueryData(["testStatus"], result.test_status);
+      return result;
+    },
+    select: (data) => data.sections
   });
 
   const handleSectionClick = (section) => {
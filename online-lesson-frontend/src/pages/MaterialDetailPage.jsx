@@ -2,11 +2,8 @@
 import React from "react";
 import { useParams, useNavigate, Link } from "react-router-dom";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { getMaterialById } from "../api/materialsApi";
-import {
-  getMaterialProgress,
-  markAttachmentComplete
-} from "../api/progressApi";
+import { getMaterialBootstrap } from "../api/bootstrapApi";
+import { markAttachmentComplete } from "../api/progressApi";
 import {
   Card,
   Typography,
@@ -34,23 +31,28 @@ export default function MaterialDetailPage() {
   const navigate = useNavigate();
   const queryClient = useQueryClient();
 
-  const { data, isLoading, isError } = useQuery({
-    queryKey: ["material", material_id],
-    queryFn: () => getMaterialById(material_id),
-    retry: false
-  });
-
-  const { data: progress, isLoading: progressLoading } = useQuery({
-    queryKey: ["progress", material_id],
-    queryFn: () => getMaterialProgress(material_id),
+  // Material va uning progressi bitta so'rovda
+  const {
+    data: bootstrap,
+    isLoading,
+    isError
+  } = useQuery({
+    queryKey: ["bootstrap", "material", material_id],
+    queryFn: async () => {
+      const result = await getMaterialBootstrap(material_id);
+      queryClient.setQueryData(["user"], result.user);
+      return result;
+    },
     enabled: !!material_id,
     retry: false
   });
+  const data = bootstrap?.material;
+  const progress = bootstrap?.progress;
 
   const markCompleteMutation = useMutation({
     mutationFn: markAttachmentComplete,
     onSuccess: () => {
-      queryClient.invalidateQueries(["progress", material_id]);
+      queryClient.invalidateQueries(["bootstrap", "material", material_id]);
       message.success("Progress yangilandi");
     },
     onError: () => {
@@ -58,7 +60,7 @@ export default function MaterialDetailPage() {
     }
   });
 
-  if (isLoading || progressLoading)
+  if (isLoading)
     return (
       <div className='flex justify-center items-center h-screen'>
         <Spin size='large' />
@@ -8,17 +8,24 @@ import {
   Space,
   message,
   Popconfirm,
-  Breadcrumb
+  Breadcrumb,
+  Upload
 } from "antd";
 import { useParams, useNavigate } from "react-router-dom";
-import { HomeOutlined, ArrowLeftOutlined } from "@ant-design/icons";
+import {
+  HomeOutlined,
+  ArrowLeftOutlined,
+  UploadOutlined
+} from "@ant-design/icons";
 import axiosClient from "../api/axiosClient";
+import { importTests } from "../api/testsApi";
 
 export default function MaterialTestsPage() {
   const { id, title } = useParams();
   const [tests, setTests] = useState([]);
   const [isModalVisible, setIsModalVisible] = useState(false);
   const [editingTest, setEditingTest] = useState(null);
+  const [importing, setImporting] = useState(false);
   const [form] = Form.useForm();
   const navigate = useNavigate();
 
@@ -66,6 +73,37 @@ export default function MaterialTestsPage() {
     }
   };
 
+  // Fayldagi barcha savollar bitta so'rovda qo'shiladi
+  const handleImport = async ({ file }) => {
+    setImporting(true);
+    try {
+      const report = await importTests(file, id);
+      const failed = report.rows.filter((r) => r.status === "failed");
+      if (failed.length === 0) {
+        message.success(`${report.created} ta test qo‘shildi!`);
+      } else {
+        Modal.warning({
+          title: `${report.created} ta test qo‘shildi, ${report.failed} ta qator xato`,
+          content: (
+            <ul style={{ maxHeight: 300, overflow: "auto" }}>
+              {failed.map((r) => (
+                <li key={r.row}>
+                  {r.row}-qator: {r.error}
+                </li>
+              ))}
+            </ul>
+          )
+        });
+      }
+      fetchTests();
+    } catch (err) {
+      console.error(err);
+      message.error(err.response?.data?.detail || "Importda xatolik!");
+    } finally {
+      setImporting(false);
+    }
+  };
+
   const handleEdit = (test) => {
     setEditingTest(test);
     setIsModalVisible(true);
@@ -156,6 +194,19 @@ export default function MaterialTestsPage() {
       >
         + Test qo‘shish
       </Button>
+      <Upload
+        accept='.csv,.xlsx,.json'
+        showUploadList={false}
+        customRequest={handleImport}
+      >
+        <Button
+          icon={<UploadOutlined />}
+          loading={importing}
+          style={{ marginLeft: 8 }}
+        >
+          Fayldan import (CSV, XLSX, JSON)
+        </Button>
+      </Upload>
 
       <Table
         dataSource={tests}
@@ -1,7 +1,6 @@
 import { Link, useNavigate, useParams } from "react-router-dom";
-import { useQuery, useQueries } from "@tanstack/react-query";
-import { getMaterialsBySection } from "../api/materialsApi";
-import { getMaterialProgress } from "../api/progressApi";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
+import { getSectionBootstrap } from "../api/bootstrapApi";
 import {
   Card,
   Row,
@@ -22,21 +21,20 @@ const { Title, Paragraph } = Typography;
 export default function MaterialsPage() {
   const { section, id } = useParams(); // section id URLdan olinadi
   const navigate = useNavigate();
+  const queryClient = useQueryClient();
 
-  const { data: materials = [], isLoading } = useQuery({
-    queryKey: ["materials", id],
-    queryFn: () => getMaterialsBySection(id)
-  });
-
-  // Fetch progress for all materials
-  const progressQueries = useQueries({
-    queries: materials.map((material) => ({
-      queryKey: ["progress", material.id],
-      queryFn: () => getMaterialProgress(material.id),
-      enabled: !!material.id,
-      retry: false
-    }))
+  // Materiallar va ularning progressi bitta so'rovda (har material uchun
+  // alohida progress so'rovi o'rniga)
+  const { data, isLoading } = useQuery({
+    queryKey: ["bootstrap", "section", id],
+    queryFn: async () => {
+      const result = await getSectionBootstrap(id);
+      queryClient.setQueryData(["user"], result.user);
+      return result;
+    }
   });
+  const materials = data?.materials ?? [];
+  const progressList = data?.progress ?? [];
 
   if (isLoading) {
     return (
@@ -84,7 +82,7 @@ export default function MaterialsPage() {
         ) : (
           <Row className='p-6' gutter={[16, 16]}>
             {materials.map((m, i) => {
-              const progressData = progressQueries[i]?.data;
+              const progressData = progressList[i];
               const percentage = progressData?.percentage || 0;
               return (
                 <Col key={m.id} onClick={() => handleCardClick(m.id)}>